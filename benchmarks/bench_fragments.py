@@ -0,0 +1,49 @@
+"""Fragment cache benchmark.
+
+Renders classes that document the same inherited methods, without and with
+a fresh fragment cache per render, and reports the speedup and hit rate.
+Run with ``python -m benchmarks.bench_fragments``.
+"""
+
+import sys
+
+from sphinx_markdown_builder.fragments import FragmentCache
+
+from . import doctrees, harness
+
+def main(sizes=(50, 100, 200)):
+    builder = harness.make_builder(markdown_fragment_cache_size=1 << 25)
+    same = True
+    try:
+        print('inherited members')
+        for size in sizes:
+            document = doctrees.inherited_members(size)
+            builder.fragments = None
+            expected = harness.render(builder, document)
+            uncached = harness.best_time(
+                lambda: harness.render(builder, document)
+            )
+            caches = []
+
+            def render():
+                builder.fragments = FragmentCache(1 << 25)
+                caches.append(builder.fragments)
+                return harness.render(builder, document)
+
+            same &= render() == expected
+            cached = harness.best_time(render)
+            cache = caches[-1]
+            print(
+                '  {:5d} classes  {:8.4f} s uncached  {:8.4f} s cached  '
+                '{:5.1f}x  {:5.1f}% hits'.format(
+                    size, uncached, cached, uncached / cached,
+                    100.0 * cache.hits / (cache.hits + cache.misses)
+                )
+            )
+        print('  output: {}'.format('identical' if same else 'DIFFERENT'))
+    finally:
+        harness.cleanup(builder)
+    return same
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
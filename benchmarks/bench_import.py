@@ -0,0 +1,101 @@
+"""Import time and cold start benchmark.
+
+Measures what importing the extension adds on top of the Sphinx modules
+``sphinx-build`` loads anyway, using ``python -X importtime``, and the wall
+time of a ``sphinx-build -b markdown`` run on a one page project.  Fails if
+either exceeds its threshold.  Run with ``python -m benchmarks.bench_import``.
+"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+PACKAGE = 'sphinx_markdown_builder'
+
+# Imported by every sphinx-build run before extensions are loaded
+PRELOAD = 'import sphinx.application, sphinx.builders'
+
+IMPORTTIME_RE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+def environment():
+    env = dict(os.environ)
+    # Measure imports the way users see them, with cached bytecode
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.getcwd()] + env.get('PYTHONPATH', '').split(os.pathsep)
+    ).rstrip(os.pathsep)
+    return env
+
+def import_time(env):
+    """Return the cumulative import time of the package in seconds."""
+    result = subprocess.run(
+        [
+            sys.executable, '-X', 'importtime', '-c',
+            '{}; import {}'.format(PRELOAD, PACKAGE)
+        ],
+        env=env,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match and match.group(4) == PACKAGE:
+            return int(match.group(2)) / 1e6
+    raise RuntimeError('{} not found in import times'.format(PACKAGE))
+
+def cold_start(env, srcdir, outdir):
+    start = time.perf_counter()
+    subprocess.check_call(
+        [
+            sys.executable, '-m', 'sphinx', '-b', 'markdown', '-q', '-E',
+            srcdir, outdir
+        ],
+        env=env,
+    )
+    return time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-import-ms', type=float, default=15.0)
+    parser.add_argument('--max-cold-start', type=float, default=3.0)
+    args = parser.parse_args(argv)
+
+    env = environment()
+    tmpdir = tempfile.mkdtemp(prefix='smb-bench-')
+    try:
+        srcdir = os.path.join(tmpdir, 'src')
+        os.mkdir(srcdir)
+        with open(os.path.join(srcdir, 'conf.py'), 'w') as f:
+            f.write('extensions = [{!r}]\n'.format(PACKAGE))
+        with open(os.path.join(srcdir, 'index.rst'), 'w') as f:
+            f.write('Index\n=====\n\nHello *world*.\n')
+        # Warm up the bytecode caches
+        import_time(env)
+        imports = min(import_time(env) for _ in range(args.repeat))
+        starts = min(
+            cold_start(env, srcdir, os.path.join(tmpdir, 'out'))
+            for _ in range(args.repeat)
+        )
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    ok = True
+    print('import {}  {:8.1f} ms'.format(PACKAGE, imports * 1e3))
+    if imports * 1e3 > args.max_import_ms:
+        print('  REGRESSION: above {} ms'.format(args.max_import_ms))
+        ok = False
+    print('sphinx-build cold start  {:8.2f} s'.format(starts))
+    if starts > args.max_cold_start:
+        print('  REGRESSION: above {} s'.format(args.max_cold_start))
+        ok = False
+    return ok
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,45 @@
+"""Deep nesting benchmark.
+
+Renders block quotes and definition lists nested up to 20 levels deep, with
+the same amount of text at every depth, and reports how the time per level
+develops.  A document nested deeper than the recursion limit must render,
+too.  Run with ``python -m benchmarks.bench_nesting``.
+"""
+
+import sys
+
+from . import doctrees, harness
+
+def main(depths=(5, 10, 20), paragraphs=200):
+    builder = harness.make_builder()
+    linear = True
+    try:
+        for name, make in (
+            ('block quotes', doctrees.nested_quotes),
+            ('definition lists', doctrees.nested_definitions),
+        ):
+            times = []
+            for depth in depths:
+                document = make(paragraphs, depth)
+                times.append(
+                    harness.best_time(
+                        lambda: harness.render(builder, document)
+                    )
+                )
+            linear &= harness.report(
+                'nested ' + name, depths, times, 'levels'
+            )
+        depth = 2 * sys.getrecursionlimit()
+        try:
+            harness.render(builder, doctrees.nested_quotes(1, depth))
+        except RecursionError:
+            print('block quotes nested {} deep: recursion error'.format(depth))
+            linear = False
+        else:
+            print('block quotes nested {} deep: ok'.format(depth))
+    finally:
+        harness.cleanup(builder)
+    return linear
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
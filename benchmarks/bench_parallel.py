@@ -0,0 +1,112 @@
+"""Parallel write benchmark.
+
+Builds a generated corpus with ``sphinx-build -b markdown`` once serially and
+once with ``-j N``, checks that both builds produce identical files and
+reports the speedup.  Run with ``python -m benchmarks.bench_parallel``.
+"""
+
+import argparse
+import filecmp
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+PAGE = """\
+Page {n}
+========
+
+Some *text* with ``code`` for page {n}, see :doc:`page{other}`.
+
+#. first
+#. second
+
+   * nested {n}
+   * nested
+
+.. list-table::
+   :header-rows: 1
+
+   * - Name
+     - Value
+   * - row {n}
+     - {wide}
+
+Section
+-------
+
+.. code-block:: python
+
+   print({n})
+
+    A quote
+    for page {n}.
+"""
+
+def make_corpus(srcdir, pages):
+    with open(os.path.join(srcdir, 'conf.py'), 'w') as f:
+        f.write("extensions = ['sphinx_markdown_builder']\n")
+    with open(os.path.join(srcdir, 'index.rst'), 'w') as f:
+        f.write('Index\n=====\n\n.. toctree::\n   :glob:\n\n   page*\n')
+    for n in range(pages):
+        with open(os.path.join(srcdir, 'page{}.rst'.format(n)), 'w') as f:
+            f.write(
+                PAGE.format(n=n, other=(n + 1) % pages, wide='x' * (n % 40))
+            )
+
+def build(srcdir, outdir, jobs):
+    start = time.perf_counter()
+    subprocess.check_call([
+        sys.executable, '-m', 'sphinx', '-b', 'markdown', '-q', '-E',
+        '-j', str(jobs), srcdir, outdir
+    ])
+    return time.perf_counter() - start
+
+def same_trees(left, right):
+    comparison = filecmp.dircmp(left, right, ignore=['.doctrees'])
+    pending = [comparison]
+    while pending:
+        comparison = pending.pop()
+        _, mismatch, errors = filecmp.cmpfiles(
+            comparison.left,
+            comparison.right,
+            comparison.common_files,
+            shallow=False
+        )
+        if comparison.left_only or comparison.right_only:
+            return False
+        if mismatch or errors:
+            return False
+        pending.extend(comparison.subdirs.values())
+    return True
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=5000)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    tmpdir = tempfile.mkdtemp(prefix='smb-bench-')
+    try:
+        srcdir = os.path.join(tmpdir, 'src')
+        os.mkdir(srcdir)
+        make_corpus(srcdir, args.pages)
+        serial = build(srcdir, os.path.join(tmpdir, 'serial'), 1)
+        parallel = build(srcdir, os.path.join(tmpdir, 'parallel'), args.jobs)
+        identical = same_trees(
+            os.path.join(tmpdir, 'serial'), os.path.join(tmpdir, 'parallel')
+        )
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    print('{} pages'.format(args.pages))
+    print('  -j 1   {:8.2f} s'.format(serial))
+    print('  -j {:<3} {:8.2f} s'.format(args.jobs, parallel))
+    print('  speedup {:.2f}x'.format(serial / parallel))
+    print('  output: {}'.format('identical' if identical else 'DIFFERENT'))
+    return identical
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
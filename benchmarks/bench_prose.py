@@ -0,0 +1,35 @@
+"""Prose benchmark.
+
+Renders pages of plain prose, which needs no escaping at all, and of prose
+split over many inline nodes with characters that need escaping, and checks
+that the time per paragraph stays flat.  Run with
+``python -m benchmarks.bench_prose``.
+"""
+
+import sys
+
+from . import doctrees, harness
+
+def main(sizes=(1000, 2000, 4000, 8000)):
+    builder = harness.make_builder()
+    linear = True
+    try:
+        for name, make in (
+            ('plain prose', doctrees.prose),
+            ('markup prose', doctrees.markup_prose),
+        ):
+            times = []
+            for size in sizes:
+                document = make(size)
+                times.append(
+                    harness.best_time(
+                        lambda: harness.render(builder, document)
+                    )
+                )
+            linear &= harness.report(name, sizes, times, 'paragraphs')
+    finally:
+        harness.cleanup(builder)
+    return linear
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,45 @@
+"""Render cache benchmark.
+
+Writes every workload of the suite with the render cache disabled and with
+a warm cache, as a rebuild of unchanged documents does, and reports the
+speedup.  Run with ``python -m benchmarks.bench_render_cache``.
+"""
+
+import sys
+
+from . import harness
+from .suite import WORKLOADS
+
+def main():
+    builder = harness.make_builder(markdown_render_cache_size=1 << 30)
+    render_cache = builder.render_cache
+    same = True
+    try:
+        for name, make, size in WORKLOADS:
+            document = make(size)
+            outfilename = builder.get_outfilename('index')
+
+            def write():
+                builder.write_markdown('index', document)
+                with open(outfilename, 'rb') as f:
+                    return f.read()
+
+            builder.render_cache = None
+            expected = write()
+            uncached = harness.best_time(write)
+            builder.render_cache = render_cache
+            write()
+            same &= write() == expected
+            cached = harness.best_time(write)
+            print(
+                '{:20s} {:8.4f} s uncached  {:8.4f} s cached  {:6.1f}x'.format(
+                    name, uncached, cached, uncached / cached
+                )
+            )
+        print('output: {}'.format('identical' if same else 'DIFFERENT'))
+    finally:
+        harness.cleanup(builder)
+    return same
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,42 @@
+"""Signature rendering benchmark.
+
+Renders a module of 10,000 autodoc members with their signatures rendered in
+one pass and with the handlers of their nodes, and checks that the output is
+identical.  Run with ``python -m benchmarks.bench_signatures``.
+"""
+
+import sys
+
+from sphinx_markdown_builder.markdown_writer import MarkdownTranslator
+
+from . import doctrees, harness
+
+class HandlerTranslator(MarkdownTranslator):
+    """Renders signatures by walking their subtrees."""
+    def render_signature(self, node):
+        return None
+
+def main(members=10000):
+    builder = harness.make_builder()
+    try:
+        document = doctrees.api_module(members)
+        builder.default_translator_class = HandlerTranslator
+        expected = harness.render(builder, document)
+        walked = harness.best_time(lambda: harness.render(builder, document))
+        del builder.default_translator_class
+        same = harness.render(builder, document) == expected
+        rendered = harness.best_time(
+            lambda: harness.render(builder, document)
+        )
+    finally:
+        harness.cleanup(builder)
+    print('api module of {} members'.format(members))
+    print('  handlers   {:8.4f} s'.format(walked))
+    print('  one pass   {:8.4f} s  {:5.2f}x'.format(
+        rendered, walked / rendered
+    ))
+    print('  output: {}'.format('identical' if same else 'DIFFERENT'))
+    return same
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,59 @@
+"""Streaming output benchmark.
+
+Compares the peak memory allocated while translating a large document to a
+string and while streaming it to a file, and the peak over a series of
+documents streamed with and without freeing written nodes.  Run with
+``python -m benchmarks.bench_streaming``.
+"""
+
+import sys
+import tracemalloc
+
+from . import doctrees, harness
+
+class NullStream(object):
+    def __init__(self):
+        self.size = 0
+
+    def write(self, text):
+        self.size += len(text)
+
+def peak(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def series(builder, free_nodes, documents=6, paragraphs=3000):
+    for _ in range(documents):
+        document = doctrees.prose(paragraphs)
+        builder.writer.write_stream(
+            document, NullStream(), free_nodes=free_nodes
+        )
+
+def main(paragraphs=8000):
+    builder = harness.make_builder()
+    try:
+        document = doctrees.prose(paragraphs)
+        stream = NullStream()
+        in_memory = peak(lambda: harness.render(builder, document))
+        streamed = peak(
+            lambda: builder.writer.write_stream(document, stream)
+        )
+        del document
+        kept = peak(lambda: series(builder, False))
+        freed = peak(lambda: series(builder, True))
+    finally:
+        harness.cleanup(builder)
+    print('{:.1f} MB of Markdown'.format(stream.size / 1e6))
+    print('  string  peak {:8.1f} MB'.format(in_memory / 1e6))
+    print('  stream  peak {:8.1f} MB'.format(streamed / 1e6))
+    print('documents in a row')
+    print('  kept    peak {:8.1f} MB'.format(kept / 1e6))
+    print('  freed   peak {:8.1f} MB'.format(freed / 1e6))
+    return streamed < in_memory and freed < kept
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
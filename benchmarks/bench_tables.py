@@ -0,0 +1,52 @@
+"""Table rendering benchmark.
+
+Renders tables of growing row counts and checks that the time per row stays
+flat, and that the peak memory allocated while spilling tables to sidecar
+files does not grow with their rows.  Run with
+``python -m benchmarks.bench_tables``.
+"""
+
+import sys
+import tracemalloc
+
+from . import doctrees, harness
+
+def main(sizes=(500, 1000, 2000, 4000)):
+    builder = harness.make_builder()
+    try:
+        times = []
+        for size in sizes:
+            document = doctrees.tall_table(size)
+            times.append(
+                harness.best_time(lambda: harness.render(builder, document))
+            )
+        linear = harness.report('table rows', sizes, times, 'rows')
+    finally:
+        harness.cleanup(builder)
+    return spill(sizes[-1:] + (sizes[-1] * 8, )) and linear
+
+def spill(sizes, max_rows=100):
+    builder = harness.make_builder(markdown_table_max_rows=max_rows)
+    try:
+        peaks = []
+        for size in sizes:
+            document = doctrees.tall_table(size)
+            builder.table_files = {}
+            tracemalloc.start()
+            try:
+                harness.render(builder, document)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+    finally:
+        harness.cleanup(builder)
+    print('spilled table rows')
+    for size, peak in zip(sizes, peaks):
+        print('  {:>8} rows   peak {:8.1f} MB'.format(size, peak / 1e6))
+    # Only the list of the rows of the doctree grows
+    flat = peaks[-1] < peaks[0] * 2
+    print('  memory: {}'.format('flat' if flat else 'GROWING'))
+    return flat
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
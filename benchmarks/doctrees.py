@@ -0,0 +1,296 @@
+"""Generators of synthetic doctrees for the benchmarks.
+
+Every generator takes a size `n` and returns a document whose node count
+grows linearly with `n`.
+"""
+
+from docutils import nodes
+from sphinx import addnodes
+
+from .harness import new_document
+
+def make_table(rows, cols=4):
+    table = nodes.table()
+    tgroup = nodes.tgroup(cols=cols)
+    table += tgroup
+    for _ in range(cols):
+        tgroup += nodes.colspec(colwidth=10)
+    thead = nodes.thead()
+    tbody = nodes.tbody()
+    tgroup += thead
+    tgroup += tbody
+    for i in range(rows + 1):
+        row = nodes.row()
+        for j in range(cols):
+            if i == 0:
+                text = 'h{}'.format(j)
+            else:
+                text = 'cell {} {} 漢字'.format(i, j)
+            row += nodes.entry('', nodes.paragraph('', text))
+        (thead if i == 0 else tbody).append(row)
+    return table
+
+def tall_table(n):
+    document = new_document()
+    document += make_table(n)
+    return document
+
+def wide_table(n):
+    document = new_document()
+    document += make_table(20, cols=n)
+    return document
+
+def nested_quotes(n, depth=20):
+    """Block quotes nested `depth` deep, with `n` paragraphs at each level."""
+    document = new_document()
+    parent = document
+    for level in range(depth):
+        quote = nodes.block_quote()
+        for i in range(n):
+            text = 'Quote at level {}, paragraph {}.\nSecond line.'.format(
+                level, i
+            )
+            quote += nodes.paragraph('', text)
+        parent += quote
+        parent = quote
+    return document
+
+def nested_definitions(n, depth=20):
+    """Definition lists nested `depth` deep, with `n` list items each."""
+    document = new_document()
+    parent = document
+    for level in range(depth):
+        definition = nodes.definition()
+        items = nodes.bullet_list()
+        for i in range(n):
+            items += nodes.list_item(
+                '', nodes.paragraph('', 'Item {} at level {}'.format(i, level))
+            )
+        definition += items
+        parent += nodes.definition_list(
+            '',
+            nodes.definition_list_item(
+                '', nodes.term('', 'Term {}'.format(level)), definition
+            )
+        )
+        parent = definition
+    return document
+
+def nested_lists(n, depth=20):
+    """Bullet and enumerated lists nested `depth` deep, `n` items each."""
+    document = new_document()
+    parent = document
+    for level in range(depth):
+        kind = nodes.enumerated_list if level % 2 else nodes.bullet_list
+        items = kind()
+        for i in range(n):
+            items += nodes.list_item(
+                '', nodes.paragraph('', 'Item {} at level {}'.format(i, level))
+            )
+        parent += items
+        parent = items[-1]
+    return document
+
+def make_signature(i):
+    desc = addnodes.desc(domain='py', objtype='method')
+    signature = addnodes.desc_signature(
+        ids=['mod.Class.method{}'.format(i)], **{'class': 'Class'}
+    )
+    signature += addnodes.desc_annotation('async ', 'async ')
+    signature += addnodes.desc_addname('Class.', 'Class.')
+    signature += addnodes.desc_name('method', 'method{}'.format(i))
+    parameters = addnodes.desc_parameterlist()
+    for name in ('self', 'value', '*args', '**kwargs'):
+        parameters += addnodes.desc_parameter(name, name)
+    signature += parameters
+    desc += signature
+    content = addnodes.desc_content()
+    content += nodes.paragraph(
+        '', 'Do something with *value* number {}.'.format(i)
+    )
+    fields = nodes.field_list()
+    for name, body in (('Parameters', 'value -- the value'),
+                       ('Returns', 'nothing')):
+        fields += nodes.field(
+            '',
+            nodes.field_name('', name),
+            nodes.field_body('', nodes.paragraph('', body)),
+        )
+    content += fields
+    desc += content
+    return desc
+
+def signatures(n):
+    """`n` autodoc style method descriptions."""
+    document = new_document()
+    section = nodes.section(ids=['module'])
+    section += nodes.title('', 'Module')
+    for i in range(n):
+        section += make_signature(i)
+    document += section
+    return document
+
+def make_member(i, params=5):
+    """A method description with a Sphinx style parameter list."""
+    desc = make_signature(i)
+    parameters = nodes.bullet_list()
+    for j in range(params):
+        parameters += nodes.list_item('', nodes.paragraph(
+            '', '',
+            addnodes.literal_strong('', 'param{}'.format(j)),
+            nodes.Text(' ('),
+            addnodes.pending_xref('', nodes.literal('', 'int')),
+            nodes.Text(') -- the value of '),
+            nodes.emphasis('', 'param{}'.format(j)),
+            nodes.Text(', with a longer description of what it does.'),
+        ))
+    desc[1][1] += nodes.field(
+        '',
+        nodes.field_name('', 'Parameters'),
+        nodes.field_body('', parameters),
+    )
+    return desc
+
+def inherited_members(n, members=20):
+    """`n` classes documenting the same `members` inherited methods."""
+    document = new_document()
+    section = nodes.section(ids=['module'])
+    section += nodes.title('', 'Module')
+    for i in range(n):
+        desc = addnodes.desc(domain='py', objtype='class')
+        desc += addnodes.desc_signature(
+            '', '', addnodes.desc_name('', 'Class{}'.format(i))
+        )
+        content = addnodes.desc_content()
+        for j in range(members):
+            member = make_member(j)
+            # Only the ids differ, as for members inherited from a base
+            member[0]['ids'] = ['mod.Class{}.method{}'.format(i, j)]
+            content += member
+        desc += content
+        section += desc
+    document += section
+    return document
+
+def sig_element(text, sig_node_type, classes):
+    """A ``desc_sig_*`` node, as Sphinx leaves it for translators that do
+    not know these nodes."""
+    return nodes.inline(
+        text, text, classes=[classes], _sig_node_type=sig_node_type
+    )
+
+def make_typed_parameter(name, type_name, default=None):
+    parameter = addnodes.desc_parameter()
+    parameter += sig_element(name, 'desc_sig_name', 'n')
+    parameter += sig_element(':', 'desc_sig_punctuation', 'p')
+    parameter += sig_element(' ', 'desc_sig_space', 'w')
+    type_node = sig_element('', 'desc_sig_name', 'n')
+    type_node += nodes.reference(
+        '', type_name, internal=True,
+        refuri='types.md#mod.{}'.format(type_name)
+    )
+    parameter += type_node
+    if default is not None:
+        parameter += sig_element(' ', 'desc_sig_space', 'w')
+        parameter += sig_element('=', 'desc_sig_operator', 'o')
+        parameter += sig_element(' ', 'desc_sig_space', 'w')
+        parameter += nodes.inline(default, default, classes=['default_value'])
+    return parameter
+
+def api_module(n):
+    """An autodoc module of `n` members with type annotated signatures, as
+    Sphinx resolves them for the ``markdown`` builder."""
+    document = new_document()
+    section = nodes.section(ids=['module-mod'])
+    section += nodes.title('', 'mod')
+    for i in range(n):
+        desc = addnodes.desc(domain='py', objtype='method')
+        signature = addnodes.desc_signature(
+            ids=['mod.Class.method_{}'.format(i)], **{'class': 'Class'}
+        )
+        annotation = addnodes.desc_annotation()
+        annotation += sig_element('async', 'desc_sig_keyword', 'k')
+        annotation += sig_element(' ', 'desc_sig_space', 'w')
+        signature += annotation
+        signature += addnodes.desc_addname('Class.', 'Class.')
+        signature += addnodes.desc_name('', 'method_{}'.format(i))
+        parameters = addnodes.desc_parameterlist()
+        parameters += addnodes.desc_parameter(
+            '', '', sig_element('self', 'desc_sig_name', 'n')
+        )
+        parameters += make_typed_parameter('value', 'Value')
+        parameters += make_typed_parameter('limit', 'int', '10')
+        parameters += make_typed_parameter('name_', 'str', "'x_y'")
+        signature += parameters
+        signature += addnodes.desc_returns('', 'Result')
+        desc += signature
+        desc += addnodes.desc_content(
+            '', nodes.paragraph('', 'Method {}.'.format(i))
+        )
+        section += desc
+    document += section
+    return document
+
+def literal_blocks(n, lines=50):
+    """`n` literal blocks of `lines` lines of code each."""
+    document = new_document()
+    for i in range(n):
+        code = '\n'.join(
+            'value_{0} = compute({0}, *args) * 2  # line {1}'.format(i, line)
+            for line in range(lines)
+        )
+        document += nodes.literal_block(code, code, language='python')
+    return document
+
+def cross_references(n, per_paragraph=10):
+    """`n` paragraphs with `per_paragraph` internal references each."""
+    document = new_document()
+    for i in range(n):
+        paragraph = nodes.paragraph()
+        for j in range(per_paragraph):
+            paragraph += nodes.Text('See ')
+            paragraph += nodes.reference(
+                '',
+                '',
+                nodes.literal('', 'target_{}_{}'.format(i, j)),
+                internal=True,
+                refuri='api/module{}.md#target-{}'.format(j, i),
+            )
+            paragraph += nodes.Text(' and ')
+            paragraph += nodes.reference(
+                '', 'this section', internal=True, refid='section-{}'.format(j)
+            )
+            paragraph += nodes.Text('. ')
+        document += paragraph
+    return document
+
+def prose(n):
+    """`n` paragraphs of plain text, with the odd inline markup."""
+    document = new_document()
+    sentence = 'The quick brown fox jumps over the lazy dog, again and again. '
+    for i in range(n):
+        paragraph = nodes.paragraph()
+        paragraph += nodes.Text(sentence * 4)
+        paragraph += nodes.emphasis('', 'emphasis {}'.format(i))
+        paragraph += nodes.Text(' ' + sentence * 2)
+        document += paragraph
+    return document
+
+def markup_prose(n):
+    """`n` paragraphs of text split over many nodes, with characters that
+    need escaping, as in API documentation."""
+    document = new_document()
+    words = (
+        'Call ', '__init__', ' with *args and ', 'snake_case', ' names, ',
+        'see [1] or ', 'a | b', '. '
+    )
+    for i in range(n):
+        paragraph = nodes.paragraph()
+        for word in words:
+            paragraph += nodes.inline('', word)
+        paragraph += nodes.reference(
+            '', 'item [{}]'.format(i), refuri='https://example.com/'
+        )
+        paragraph += nodes.Text(' and ' + ''.join(words))
+        document += paragraph
+    return document
@@ -0,0 +1,96 @@
+"""Helpers shared by the benchmarks.
+
+The benchmarks translate synthetic doctrees with a real ``markdown`` builder,
+so they exercise exactly the code ``sphinx-build -b markdown`` runs, without
+the reading and resolving phases getting in the way of the measurements.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+from docutils import frontend, utils
+from docutils.io import StringOutput
+from sphinx.application import Sphinx
+
+from sphinx_markdown_builder.doctree2md import Writer
+
+def make_builder(**confoverrides):
+    """Return a ready-to-write ``MarkdownBuilder`` for a throwaway project.
+
+    The fragment cache is disabled unless enabled by `confoverrides`, as
+    benchmarks render the same doctrees over and over again.
+    """
+    confoverrides.setdefault('markdown_fragment_cache_size', 0)
+    srcdir = tempfile.mkdtemp(prefix='smb-bench-')
+    with open(os.path.join(srcdir, 'conf.py'), 'w') as f:
+        f.write("extensions = ['sphinx_markdown_builder']\n")
+    with open(os.path.join(srcdir, 'index.rst'), 'w') as f:
+        f.write('Index\n=====\n')
+    outdir = os.path.join(srcdir, '_build')
+    app = Sphinx(
+        srcdir,
+        srcdir,
+        outdir,
+        os.path.join(outdir, '.doctrees'),
+        'markdown',
+        confoverrides=confoverrides,
+        status=None,
+        warning=None,
+        freshenv=True,
+    )
+    app.builder.prepare_writing(set())
+    app.builder.bench_tmpdir = srcdir
+    return app.builder
+
+def cleanup(builder):
+    shutil.rmtree(builder.bench_tmpdir, ignore_errors=True)
+
+def new_document():
+    settings = frontend.get_default_settings(Writer)
+    settings.report_level = 5
+    return utils.new_document('<benchmark>', settings)
+
+def count_nodes(document):
+    findall = getattr(document, 'findall', document.traverse)
+    return sum(1 for _ in findall())
+
+def render(builder, document, docname='index'):
+    """Translate `document` as the builder's ``write_doc`` would."""
+    builder.current_docname = docname
+    builder.writer.write(document, StringOutput(encoding='unicode'))
+    return builder.writer.output
+
+def best_time(func, repeat=3):
+    """Return the best wall clock time of `repeat` calls to `func`."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def check_linear(sizes, times, tolerance=2.0):
+    """Return True if `times` grow at most linearly with `sizes`.
+
+    The time per unit of the largest input may be at most `tolerance` times
+    the time per unit of the smallest one.  A quadratic algorithm fails this
+    as soon as the sizes span more than `tolerance`.
+    """
+    first = times[0] / sizes[0]
+    last = times[-1] / sizes[-1]
+    return last <= first * tolerance
+
+def report(title, sizes, times, unit):
+    print(title)
+    for size, elapsed in zip(sizes, times):
+        print(
+            '  {:>8} {:<8} {:9.4f} s {:12.0f} {}/s'.format(
+                size, unit, elapsed, size / elapsed, unit
+            )
+        )
+    linear = check_linear(sizes, times)
+    print('  scaling: {}'.format('linear' if linear else 'SUPERLINEAR'))
+    return linear
@@ -0,0 +1,85 @@
+"""Throughput and scaling suite for the translator.
+
+Translates every synthetic workload of :mod:`benchmarks.doctrees` at three
+sizes, reports throughput in nodes/s and MB/s of Markdown, and fails if the
+time per node of any workload grows with its size, which is how quadratic
+regressions show.  Run with ``python -m benchmarks.suite``.
+"""
+
+import argparse
+import sys
+
+from . import doctrees, harness
+
+# Workload name, generator and smallest size
+WORKLOADS = (
+    ('tall tables', doctrees.tall_table, 1000),
+    ('wide tables', doctrees.wide_table, 100),
+    ('nested quotes', doctrees.nested_quotes, 50),
+    ('nested definitions', doctrees.nested_definitions, 50),
+    ('nested lists', doctrees.nested_lists, 50),
+    ('desc signatures', doctrees.signatures, 2500),
+    ('api module', doctrees.api_module, 2500),
+    ('literal blocks', doctrees.literal_blocks, 250),
+    ('cross references', doctrees.cross_references, 250),
+    ('prose', doctrees.prose, 1000),
+    ('markup prose', doctrees.markup_prose, 500),
+)
+
+def run(builder, make, size):
+    document = make(size)
+    count = harness.count_nodes(document)
+    output = []
+
+    def render():
+        output[:] = [harness.render(builder, document)]
+
+    elapsed = harness.best_time(render)
+    return count, len(output[0].encode('utf-8')), elapsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--scale', type=float, default=1.0, help='multiply all sizes'
+    )
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=2.0,
+        help='allowed growth of the time per node from the smallest to '
+        'the largest size'
+    )
+    parser.add_argument('workloads', nargs='*', help='only run these')
+    args = parser.parse_args(argv)
+
+    builder = harness.make_builder()
+    failed = []
+    try:
+        for name, make, base in WORKLOADS:
+            if args.workloads and name not in args.workloads:
+                continue
+            base = max(1, int(base * args.scale))
+            print(name)
+            counts, times = [], []
+            for size in (base, base * 2, base * 4):
+                count, length, elapsed = run(builder, make, size)
+                counts.append(count)
+                times.append(elapsed)
+                print(
+                    '  n={:<7} {:8} nodes {:8.3f} s {:10.0f} nodes/s '
+                    '{:7.2f} MB/s'.format(
+                        size, count, elapsed, count / elapsed,
+                        length / elapsed / 1e6
+                    )
+                )
+            if not harness.check_linear(counts, times, args.tolerance):
+                print('  SUPERLINEAR')
+                failed.append(name)
+    finally:
+        harness.cleanup(builder)
+    if failed:
+        print('superlinear scaling: ' + ', '.join(failed))
+    return not failed
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -29,20 +29,31 @@ setup(
         'Intended Audience :: Developers',
         'Topic :: Utilities',
         'License :: OSI Approved :: MIT License',
-        'Programming Language :: Python :: 2',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
-        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
+        'Programming Language :: Python :: 3.12',
     ],
     keywords='sphinx docs documentation markdown',
-    packages=find_packages(exclude=['contrib', 'docs', 'tests']),
+    packages=find_packages(
+        exclude=['benchmarks', 'contrib', 'docs', 'tests']
+    ),
+    # tracemalloc.reset_peak, for markdown_memory_budget
+    python_requires='>=3.9',
     install_requires=install_requires,
+    extras_require={
+        # Brotli compressed siblings, with ``markdown_compress``
+        'brotli': ['brotli'],
+        # Test suite, run with ``make test``
+        'test': ['pytest>=6.0'],
+    },
     include_package_data=True,
     entry_points={
         'sphinx.builders': [
             'markdown = sphinx_markdown_builder',
+            'singlemarkdown = sphinx_markdown_builder',
         ],
     }
 )
@@ -1,4 +1,36 @@
+__version__ = '0.5.5'
+
 from .markdown_builder import MarkdownBuilder
+from .singlemarkdown_builder import SingleMarkdownBuilder
 
 def setup(app):
     app.add_builder(MarkdownBuilder)
+    app.add_builder(SingleMarkdownBuilder)
+    app.add_config_value('markdown_tables_compact', False, '')
+    app.add_config_value('markdown_stream_output', False, '')
+    app.add_config_value('markdown_profile', '', '')
+    app.add_config_value('markdown_trace', '', '')
+    app.add_config_value('markdown_fragment_cache_size', 0, '')
+    app.add_config_value('markdown_render_cache_size', 0, '')
+    app.add_config_value('markdown_sections_db', '', '')
+    app.add_config_value('markdown_http_base', '', '')
+    app.add_config_value('markdown_writer_threads', 4, '')
+    app.add_config_value('markdown_compress', [], '')
+    app.add_config_value('markdown_compress_level', 9, '')
+    app.add_config_value('markdown_bundle', '', '')
+    app.add_config_value('markdown_bundle_shards', 1, '')
+    app.add_config_value('markdown_chunks', '', '')
+    app.add_config_value('markdown_chunk_tokens', 512, '')
+    app.add_config_value('markdown_copy_assets', False, '')
+    app.add_config_value('markdown_hardlink_assets', False, '')
+    app.add_config_value('markdown_low_memory', False, '')
+    app.add_config_value('markdown_memory_budget', 0, '')
+    app.add_config_value('markdown_table_max_rows', 0, '')
+    app.add_config_value('markdown_table_max_bytes', 0, '')
+    app.add_config_value('markdown_table_preview_rows', 10, '')
+    app.add_config_value('markdown_table_format', 'csv', '')
+    return {
+        'version': __version__,
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -0,0 +1,64 @@
+from os import path
+import hashlib
+import os
+import shutil
+
+def same_content(filename, other):
+    """Return whether two files of the same size have the same content."""
+    digests = []
+    for name in (filename, other):
+        digest = hashlib.sha256()
+        with open(name, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 16), b''):
+                digest.update(block)
+        digests.append(digest.digest())
+    return digests[0] == digests[1]
+
+def copy_asset(src, dest, hardlink=False):
+    """Copy `src` to `dest`, unless it holds the same content already.
+
+    A `dest` with the size and mtime of `src` is taken to be unchanged, one
+    with the same size but another mtime is compared by content.  Copies
+    keep the mtime of `src`, so the next build finds them unchanged by
+    their metadata alone.  With `hardlink`, `dest` is a hard link to `src`
+    instead, unless they are on different file systems.  Return whether
+    `dest` was written.
+    """
+    stat = os.stat(src)
+    try:
+        dest_stat = os.stat(dest)
+    except FileNotFoundError:
+        dest_stat = None
+    if dest_stat is not None and dest_stat.st_size == stat.st_size:
+        if dest_stat.st_mtime_ns == stat.st_mtime_ns:
+            return False
+        if same_content(src, dest):
+            os.utime(dest, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            return False
+    tmpname = dest + '.tmp'
+    if path.lexists(tmpname):
+        os.remove(tmpname)
+    linked = False
+    if hardlink:
+        try:
+            os.link(src, tmpname)
+            linked = True
+        except OSError:
+            # E.g. another file system, copy instead
+            pass
+    if not linked:
+        shutil.copy2(src, tmpname)
+    os.replace(tmpname, dest)
+    return True
+
+def prune_assets(dirname, keep):
+    """Remove all files below `dirname` whose path relative to it is not in
+    `keep`, and the directories left empty."""
+    for root, dirnames, filenames in os.walk(dirname, topdown=False):
+        for filename in filenames:
+            filename = path.join(root, filename)
+            relname = path.relpath(filename, dirname).replace(os.sep, '/')
+            if relname not in keep:
+                os.remove(filename)
+        if root != dirname and not os.listdir(root):
+            os.rmdir(root)
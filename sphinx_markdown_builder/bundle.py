@@ -0,0 +1,118 @@
+from .compat import findall
+from os import path
+from urllib.parse import urlsplit
+import json
+import os
+import posixpath
+import zlib
+from docutils import nodes
+
+# Start of every line, records are written with the docname first
+LINE_START = '{"docname": '
+
+def line_docname(line):
+    """Return the docname of a bundle line, without decoding it all."""
+    if line.startswith(LINE_START):
+        return json.JSONDecoder().raw_decode(line, len(LINE_START))[0]
+    return json.loads(line)['docname']
+
+def document_links(doctree, uri):
+    """Return the targets of all links leaving the document at `uri`.
+
+    Links to other documents are made relative to the output directory,
+    like `uri`, and external links are kept as they are.  Links within the
+    document are left out, and every target is listed once.
+    """
+    links = []
+    seen = set()
+    for node in findall(doctree, nodes.reference):
+        link = node.get('refuri')
+        if not link or link.startswith('#'):
+            continue
+        parts = urlsplit(link)
+        if node.get('internal') and not (parts.scheme or parts.netloc):
+            link = posixpath.normpath(
+                posixpath.join(posixpath.dirname(uri), parts.path)
+            )
+            if parts.fragment:
+                link += '#' + parts.fragment
+        if link not in seen:
+            seen.add(link)
+            links.append(link)
+    return links
+
+class Bundle(object):
+    """JSON Lines files holding every document, one per line.
+
+    With several `shards`, each document always goes to the same one,
+    chosen by the CRC-32 of its docname, so consumers can read them in
+    parallel.  Lines are in no particular order.
+    """
+    def __init__(self, filename, shards=1):
+        self.filename = filename
+        self.shards = max(shards, 1)
+
+    @property
+    def filenames(self):
+        if self.shards == 1:
+            return [self.filename]
+        root, ext = path.splitext(self.filename)
+        return [
+            '{}-{:03d}-of-{:03d}{}'.format(root, i, self.shards, ext)
+            for i in range(self.shards)
+        ]
+
+    def shard(self, docname):
+        return zlib.crc32(docname.encode('utf-8')) % self.shards
+
+    def lines(self, record):
+        """Return the lines of the document `record`."""
+        return [json.dumps(record, ensure_ascii=False) + '\n']
+
+    def update(self, records, docnames, previous=()):
+        """Write the documents in `records`, and copy those still in
+        `docnames` from the `previous` bundle files.
+
+        Every file is replaced once complete, and files of `previous` that
+        are not part of this bundle are removed.  Return the number of
+        documents written and of lines copied.
+        """
+        filenames = self.filenames
+        os.makedirs(path.dirname(self.filename), exist_ok=True)
+        files = [
+            open(filename + '.tmp', 'w', encoding='utf-8', buffering=1 << 20)
+            for filename in filenames
+        ]
+        try:
+            written = set()
+            for record in records:
+                written.add(record['docname'])
+                files[self.shard(record['docname'])].writelines(
+                    self.lines(record)
+                )
+            copied = 0
+            for filename in previous:
+                try:
+                    f = open(filename, encoding='utf-8')
+                except FileNotFoundError:
+                    continue
+                with f:
+                    for line in f:
+                        docname = line_docname(line)
+                        if docname in written or docname not in docnames:
+                            continue
+                        files[self.shard(docname)].write(line)
+                        copied += 1
+            for f in files:
+                f.close()
+            for filename in filenames:
+                os.replace(filename + '.tmp', filename)
+        finally:
+            for f, filename in zip(files, filenames):
+                f.close()
+                if path.exists(filename + '.tmp'):
+                    os.remove(filename + '.tmp')
+        for filename in previous:
+            if filename not in filenames and path.exists(filename):
+                os.remove(filename)
+        return len(written), copied
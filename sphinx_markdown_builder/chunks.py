@@ -0,0 +1,174 @@
+from .bundle import Bundle
+from os import path
+import hashlib
+import json
+import re
+
+# Words, numbers and single punctuation characters, a rough but stable
+# estimate of the tokens of embedding models
+TOKEN_RE = re.compile(r'\w+|[^\w\s]')
+
+FENCE = '```'
+
+HEADING_RE = re.compile(r'#{1,6} ')
+
+# Line between the header and the body of a table
+TABLE_RULE_RE = re.compile(r'\|[-:| ]+\|$')
+
+def count_tokens(text):
+    return len(TOKEN_RE.findall(text))
+
+def is_heading(block):
+    return HEADING_RE.match(block) is not None
+
+def split_blocks(markdown):
+    """Return the blocks of `markdown`, which are separated by blank lines
+    outside of fenced code.  Headings are blocks of their own."""
+    blocks = []
+    lines = []
+    fenced = False
+    for line in markdown.split('\n'):
+        if line.lstrip().startswith(FENCE):
+            fenced = not fenced
+        elif not fenced and (not line.strip() or is_heading(line)):
+            if lines:
+                blocks.append('\n'.join(lines))
+                lines = []
+            if line.strip():
+                blocks.append(line)
+            continue
+        lines.append(line)
+    if lines:
+        blocks.append('\n'.join(lines))
+    return blocks
+
+def split_block(block, max_tokens):
+    """Split the lines of `block` into pieces of at most `max_tokens`.
+
+    A fenced code block is closed at the end of each piece and opened again
+    at the start of the next one, and each piece of a table repeats its
+    header.  Pieces are only longer if a single line is, along with the
+    repeated lines.
+    """
+    lines = block.split('\n')
+    head = []
+    tail = []
+    first = lines[0]
+    if first.lstrip().startswith(FENCE) and len(lines) > 1:
+        indent = first[:len(first) - len(first.lstrip())]
+        head = [first]
+        tail = [indent + FENCE]
+        lines = lines[1:]
+        if lines[-1].strip() == FENCE:
+            lines = lines[:-1]
+    elif len(lines) > 2 and TABLE_RULE_RE.match(lines[1]):
+        head = lines[:2]
+        lines = lines[2:]
+    # Room for the lines repeated around each piece
+    max_tokens -= count_tokens('\n'.join(head + tail))
+    pieces = []
+    piece = []
+    tokens = 0
+    for line in lines:
+        line_tokens = count_tokens(line)
+        if piece and tokens + line_tokens > max_tokens:
+            pieces.append(piece)
+            piece = []
+            tokens = 0
+        piece.append(line)
+        tokens += line_tokens
+    if piece:
+        pieces.append(piece)
+    return ['\n'.join(head + piece + tail) for piece in pieces]
+
+def chunk_section(markdown, max_tokens):
+    """Return the chunks of the Markdown of a section, without subsections.
+
+    Blocks are packed into chunks of at most `max_tokens`, and every
+    heading, such as the signature of an API description, starts a new
+    chunk.  Headings stay with the block following them, so a chunk is
+    only longer than `max_tokens` by them, or if a single line is.  A
+    section of nothing but its title has no chunk, the title is part of
+    the heading paths of its subsections.
+    """
+    chunks = []
+    blocks = []
+    tokens = 0
+
+    def finish():
+        if not all(map(is_heading, blocks)):
+            chunks.append('\n\n'.join(blocks))
+
+    for block in split_blocks(markdown):
+        block_tokens = count_tokens(block)
+        # Headings stay with the content that follows them
+        if not all(map(is_heading, blocks)) and (
+            is_heading(block) or tokens + block_tokens > max_tokens
+        ):
+            finish()
+            blocks = []
+            tokens = 0
+        if block_tokens > max_tokens:
+            pieces = split_block(block, max_tokens)
+            for piece in pieces[:-1]:
+                blocks.append(piece)
+                finish()
+                blocks = []
+                tokens = 0
+            block = pieces[-1]
+            block_tokens = count_tokens(block)
+        blocks.append(block)
+        tokens += block_tokens
+    finish()
+    return chunks
+
+def chunk_id(docname, path, text):
+    """Return the ID of a chunk, a digest of its document, heading path and
+    text, which stays the same as long as they do."""
+    data = json.dumps([docname, path, text], ensure_ascii=False)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+def document_chunks(docname, uri, rows, max_tokens):
+    """Return the chunks of the section `rows` of a document, as returned
+    by :func:`~sphinx_markdown_builder.section_db.split_sections`."""
+    chunks = []
+    for anchor, _, path, markdown in rows:
+        for text in chunk_section(markdown, max_tokens):
+            chunks.append({
+                'docname': docname,
+                'id': chunk_id(docname, path, text),
+                'uri': uri + '#' + anchor if anchor else uri,
+                'path': path,
+                'text': text,
+                'tokens': count_tokens(text),
+            })
+    return chunks
+
+def changes_filename(filename):
+    """Return the name of the file listing the chunks added and removed
+    from the chunk file `filename`."""
+    return path.splitext(filename)[0] + '.changes.json'
+
+def read_chunk_ids(filename):
+    """Return the IDs of all chunks in the chunk file `filename`, empty if
+    there is none."""
+    ids = set()
+    try:
+        with open(filename, encoding='utf-8') as f:
+            for line in f:
+                ids.add(json.loads(line)['id'])
+    except FileNotFoundError:
+        pass
+    return ids
+
+class ChunkFile(Bundle):
+    """JSON Lines file holding every chunk of all documents, one per line.
+
+    Records are documents with their ``chunks``, of which each gets its
+    own line, starting with its docname like bundle lines do.
+    """
+    def lines(self, record):
+        return [
+            json.dumps(chunk, ensure_ascii=False) + '\n'
+            for chunk in record['chunks']
+        ]
@@ -0,0 +1,43 @@
+"""Shims for the Sphinx and docutils versions supported, see
+requirements.txt."""
+from docutils import nodes
+from sphinx.builders import Builder
+from sphinx.environment import BuildEnvironment
+import inspect
+
+try:
+    from sphinx.util.display import status_iterator
+except ImportError:
+    # Sphinx < 6.1
+    from sphinx.util import status_iterator
+
+# docutils >= 0.18 iterates over nodes with findall, traverse is deprecated
+HAS_FINDALL = hasattr(nodes.Node, 'findall')
+
+# Sphinx >= 8.1 writes the documents of a build with this builder method
+HAS_WRITE_DOCUMENTS = hasattr(Builder, 'write_documents')
+
+# Sphinx >= 9 wants the tags of the build to resolve doctrees with
+RESOLVE_TAKES_TAGS = 'tags' in inspect.signature(
+    BuildEnvironment.get_and_resolve_doctree
+).parameters
+
+def findall(node, condition):
+    """Iterate over the nodes below and including `node` that match
+    `condition`."""
+    if HAS_FINDALL:
+        return node.findall(condition)
+    return node.traverse(condition)
+
+def get_app(builder):
+    """Return the application of `builder`, without the deprecation warning
+    of ``builder.app`` on Sphinx >= 9."""
+    return getattr(builder, '_app', None) or builder.app
+
+def get_and_resolve_doctree(builder, docname):
+    """Return the resolved doctree of `docname` for `builder`."""
+    if RESOLVE_TAKES_TAGS:
+        return builder.env.get_and_resolve_doctree(
+            docname, builder, tags=builder.tags
+        )
+    return builder.env.get_and_resolve_doctree(docname, builder)
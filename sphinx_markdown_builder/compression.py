@@ -0,0 +1,64 @@
+from os import path
+import gzip
+import os
+
+def gzip_compressor(level):
+    # A fixed mtime keeps the output of unchanged files identical
+    return lambda data: gzip.compress(data, min(level, 9), mtime=0)
+
+def brotli_compressor(level):
+    # Optional dependency, only needed for ``.br`` files
+    import brotli
+    return lambda data: brotli.compress(data, quality=min(level, 11))
+
+# Sibling suffix and compressor factory, by format name
+FORMATS = {
+    'gzip': ('.gz', gzip_compressor),
+    'brotli': ('.br', brotli_compressor),
+}
+
+def load_compressor(name, level):
+    """Return the sibling suffix and compress function of format `name`.
+
+    Raise ValueError for unknown formats, and ImportError if the format
+    needs a package that is not installed.
+    """
+    if name not in FORMATS:
+        raise ValueError(name)
+    suffix, factory = FORMATS[name]
+    return suffix, factory(level)
+
+class Compressor(object):
+    """Writes precompressed siblings of output files, e.g. ``index.md.gz``.
+
+    They are meant for web servers serving them in place of the output
+    files, like nginx with ``gzip_static``.  Each sibling is written to a
+    temporary file first, so a server never sees a partial one.
+    """
+    def __init__(self, compressors):
+        # Sibling suffixes and compress functions
+        self.compressors = compressors
+
+    @property
+    def suffixes(self):
+        return [suffix for suffix, _ in self.compressors]
+
+    def missing(self, filename):
+        """Return whether a sibling of `filename` does not exist."""
+        return not all(
+            path.isfile(filename + suffix) for suffix in self.suffixes
+        )
+
+    def compress(self, filename, data):
+        """Write the siblings of `filename`, whose content is `data`."""
+        for suffix, compress in self.compressors:
+            sibling = filename + suffix
+            tmpname = sibling + '.tmp'
+            try:
+                with open(tmpname, 'wb') as f:
+                    f.write(compress(data))
+                os.replace(tmpname, sibling)
+            except BaseException:
+                if path.exists(tmpname):
+                    os.remove(tmpname)
+                raise
@@ -161,14 +161,109 @@ https://github.com/cgwrench/rst2md
 
 from __future__ import unicode_literals
 
+from functools import lru_cache
 import re
 from textwrap import dedent
 import posixpath
+from urllib.parse import quote
 
 __docformat__ = 'reStructuredText'
 
 from docutils import frontend, nodes, writers, languages
 from collections import OrderedDict
+from .fragments import subtree_digest
+
+# Characters ``str.splitlines`` breaks lines at
+LINE_BREAKS = frozenset('\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029')
+
+# Lines are (text, blank, closed) tuples.  ``text`` is a string or a
+# (left, right) pair of texts, so that prefixing and joining lines never
+# copies any text.  ``blank`` is True for all whitespace lines and ``closed``
+# for lines ending with a line break.
+BLANK_LINE = ('\n', True, True)
+
+def split_lines(text):
+    """Return `text` as a list of lines."""
+    return [
+        (line, not line.strip(), line[-1] in LINE_BREAKS)
+        for line in text.splitlines(True)
+    ]
+
+class LineRun(object):
+    """Complete lines that get `prefix` prepended on output, unless blank.
+
+    Entries are lines or nested LineRuns.  Wrapping the lines an inner
+    IndentLevel wrote into a LineRun records the prefix of the outer level
+    without touching the lines, so each line is prefixed only once, when
+    the outermost level writes to the document.
+    """
+    __slots__ = ('entries', 'prefix')
+
+    def __init__(self, entries, prefix):
+        self.entries = entries
+        self.prefix = prefix
+
+class PrefixedLines(object):
+    """Lines an IndentLevel has written to an enclosing IndentLevel.
+
+    The `first` and `last` lines already have their prefixes; the enclosing
+    level may still join them with its own text.  The lines in between are
+    kept in the LineRun `middle`.  Instances are immutable.
+    """
+    __slots__ = ('first', 'middle', 'last')
+
+    def __init__(self, first, middle=None, last=None):
+        self.first = first
+        self.middle = middle
+        self.last = last
+
+    def __str__(self):
+        return join_lines(self)
+
+    def __getitem__(self, index):
+        if index == -1:
+            text = (self.last or self.first)[0]
+            while text.__class__ is not str:
+                text = text[1]
+            return text[-1]
+        return str(self)[index]
+
+    def strip(self):
+        return str(self).strip()
+
+def join_lines(lines):
+    """Return the text of PrefixedLines `lines` as a single string."""
+    pieces = []
+    # Prefixes of the LineRuns we are in, outermost first
+    prefixes = []
+    # Pending lines and LineRuns; None marks the end of a LineRun
+    stack = [
+        entry for entry in (lines.last, lines.middle, lines.first) if entry
+    ]
+    while stack:
+        entry = stack.pop()
+        if entry is None:
+            prefixes.pop()
+            continue
+        if entry.__class__ is LineRun:
+            prefixes.append(entry.prefix)
+            stack.append(None)
+            stack.extend(reversed(entry.entries))
+            continue
+        text, blank, closed = entry
+        if blank and prefixes:
+            pieces.append('\n')
+            continue
+        pieces.append(''.join(prefixes))
+        texts = [text]
+        while texts:
+            text = texts.pop()
+            if text.__class__ is str:
+                pieces.append(text)
+            else:
+                texts.append(text[1])
+                texts.append(text[0])
+    return ''.join(pieces)
 
 class IndentLevel(object):
     """Class to hold text being written for a certain indentation level.
@@ -182,8 +277,10 @@ class IndentLevel(object):
 
     In most respects, IndentLevel behaves like a list.
     """
+    __slots__ = ('base', 'prefix', 'first_prefix', 'content')
+
     def __init__(self, base, prefix, first_prefix=None):
-        self.base = base  # The list to which we eventually write
+        self.base = base  # The list or IndentLevel to which we write
         self.prefix = prefix  # Text prepended to lines
         # Text prepended to first list
         self.first_prefix = prefix if first_prefix is None else first_prefix
@@ -196,12 +293,47 @@ class IndentLevel(object):
     def __getitem__(self, index):
         return self.content[index]
 
+    def __setitem__(self, index, value):
+        self.content[index] = value
+
     def __len__(self):
         return len(self.content)
 
     def __bool__(self):
         return len(self) != 0
 
+    def _content_lines(self):
+        """Return ``self.content`` as a list of lines and LineRuns."""
+        lines = []
+        tail = None  # Line not terminated yet
+        strings = []
+        for item in self.content + [None]:
+            if item.__class__ is str:
+                strings.append(item)
+                continue
+            # Join runs of strings before splitting, as one line often
+            # consists of many strings
+            item_lines = split_lines(''.join(strings)) if strings else []
+            strings = []
+            if item is not None:
+                item_lines.append(item.first)
+                if item.middle is not None:
+                    # Always preceded by the closed first line
+                    item_lines.append(item.middle)
+                if item.last is not None:
+                    item_lines.append(item.last)
+            for line in item_lines:
+                if tail is not None:
+                    line = ((tail[0], line[0]), tail[1] and line[1], line[2])
+                    tail = None
+                if line.__class__ is LineRun or line[2]:
+                    lines.append(line)
+                else:
+                    tail = line
+        if tail is not None:
+            lines.append(tail)
+        return lines
+
     def write(self):
         """Add ``self.contents`` with current ``prefix`` and ``first_prefix``
 
@@ -210,18 +342,85 @@ class IndentLevel(object):
 
         Empty (all whitespace) lines get written as bare carriage returns, to
         avoid ugly extra whitespace.
+
+        Written to another IndentLevel, only the first and last lines are
+        prefixed right away.  The prefix of the lines in between is applied
+        when the outermost level writes to a list.
         """
-        string = ''.join(self.content)
-        lines = string.splitlines(True)
+        lines = self._content_lines()
         if len(lines) == 0:
             return
-        texts = [self.first_prefix + lines[0]]
-        for line in lines[1:]:
-            if line.strip() == '':  # avoid prefix for empty lines
-                texts.append('\n')
+        text, blank, closed = lines[0]
+        prefix = self.first_prefix
+        first = ((prefix, text), blank and not prefix.strip(), closed)
+        middle = last = None
+        if len(lines) > 1:
+            # The last line follows the last LineRun, if any
+            text, blank, closed = lines[-1]
+            if blank:  # avoid prefix for empty lines
+                last = BLANK_LINE
             else:
-                texts.append(self.prefix + line)
-        self.base.append(''.join(texts))
+                last = ((self.prefix, text), False, closed)
+        if len(lines) > 2:
+            middle = LineRun(lines[1:-1], self.prefix)
+        written = PrefixedLines(first, middle, last)
+        if isinstance(self.base, IndentLevel):
+            self.base.append(written)
+        else:
+            self.base.append(join_lines(written))
+
+class OutputSink(object):
+    """Write translated output to `stream` as it is produced.
+
+    Written text is stripped and joined exactly like
+    :meth:`Translator.astext` strips and joins the sections of the document,
+    so the stream receives the same text ``astext`` would return.  Trailing
+    whitespace is held back until we know whether more text follows.
+    """
+    __slots__ = ('stream', 'buffer', 'pending', 'in_part', 'written')
+
+    def __init__(self, stream):
+        self.stream = stream
+        # Text collected since the last ``commit``
+        self.buffer = []
+        # Trailing whitespace not written yet
+        self.pending = ''
+        # Whether the current section has produced text yet
+        self.in_part = False
+        # Whether any text was written at all
+        self.written = False
+
+    def start_part(self):
+        """Start the next section, discarding held back whitespace."""
+        self.in_part = False
+        self.pending = ''
+
+    def write(self, text):
+        if not self.in_part:
+            text = text.lstrip()
+            if not text:
+                return
+            self.in_part = True
+            if self.written:
+                self.buffer.append('\n\n')
+        content = text.rstrip()
+        if not content:
+            self.pending += text
+            return
+        self.buffer.append(self.pending)
+        self.buffer.append(content)
+        self.pending = text[len(content):]
+        self.written = True
+
+    def commit(self):
+        """Write the collected text to the stream in one go."""
+        if self.buffer:
+            self.stream.write(''.join(self.buffer))
+            self.buffer = []
+
+    def close(self):
+        self.buffer.append('\n')
+        self.commit()
 
 def _make_method(to_add):
     """Make a method that adds `to_add`
@@ -266,7 +465,54 @@ def add_pass_thru(pass_thrus):
     return dec
 
 # Characters that should be escaped in Markdown
-ESCAPE_RE = re.compile(r'([\\*`])')
+ESCAPE_CHARS = '\\*`_'
+
+# Characters that should be escaped in table cells, headings and link text
+TABLE_CELL_CHARS = '|'
+HEADING_CHARS = '#'
+LINK_TEXT_CHARS = '[]'
+
+# Underscores that are not between two letters or digits, and so could be
+# taken for emphasis
+EMPHASIS_UNDERSCORE_RE = re.compile(r'_(?:(?![^\W_])|(?<![^\W_]_))')
+
+class Escaper(object):
+    """Backslash escape characters with special meaning in Markdown.
+
+    Text without any of the characters, the common case, is returned as is
+    after a substring check per character, which is much cheaper than a
+    regular expression scan.  ``_`` is only escaped where it could start or
+    end emphasis, so ``snake_case`` stays readable.
+    """
+    __slots__ = ('chars', 'regex', 'underscore')
+
+    def __init__(self, chars):
+        self.chars = chars
+        self.regex = re.compile(
+            '([{}])'.format(re.escape(chars.replace('_', '')))
+        )
+        self.underscore = '_' in chars
+
+    def __call__(self, text):
+        for char in self.chars:
+            if char in text:
+                break
+        else:
+            return text
+        text = self.regex.sub(r'\\\1', text)
+        if self.underscore and '_' in text:
+            text = EMPHASIS_UNDERSCORE_RE.sub(r'\\_', text)
+        return text
+
+@lru_cache(maxsize=None)
+def get_escaper(chars):
+    """Return the shared :class:`Escaper` for the set of `chars`."""
+    return Escaper(''.join(sorted(set(chars))))
+
+def report_unsupported(document, node_type):
+    document.reporter.warning(
+        'The ' + node_type + ' element not yet supported in Markdown.'
+    )
 
 # Doctree elements for which Markdown element is <prefix><content><suffix>
 PREF_SUFF_ELEMENTS = {
@@ -302,19 +548,43 @@ class Translator(nodes.NodeVisitor):
 
     std_indent = '    '
 
+    # Nodes whose rendered output can be reused from the fragment cache
+    fragment_nodes = ()
+    # Attributes that do not show in the output
+    unrendered_attributes = frozenset(('ids', 'names', 'dupnames', 'backrefs'))
+    # Attributes of which only whether they are set shows in the output
+    flag_attributes = frozenset()
+
     def __init__(self, document, builder=None):
         nodes.NodeVisitor.__init__(self, document)
         self.builder = builder
         self.settings = settings = document.settings
         lcode = settings.language_code
         self.language = languages.get_language(lcode, document.reporter)
-        # Not-None here indicates Markdown should use HTTP for internal and
+        # Not empty here indicates Markdown should use HTTP for internal and
         # download links.
         self.markdown_http_base = (
             builder.markdown_http_base if builder else None
         )
+        # Images and downloadable files are copied to the output directory
+        self.markdown_copy_assets = (
+            builder.markdown_copy_assets if builder else False
+        )
         # Warn only once per writer about unsupported elements
         self._warned = set()
+        # Unsupported elements met so far, in order
+        self._unsupported = []
+        # Visit and depart handlers, by node class
+        self._handlers = {}
+        # FragmentCache to reuse the output of subtrees from, if any
+        self.fragments = None
+        # Digests of the subtrees of the document, by node id
+        self._digests = {}
+        # Keys and capture levels of the fragments being rendered
+        self._fragment_stack = []
+        # Number of files written besides the output, which the output of
+        # a fragment cannot be reused without
+        self.side_effects = 0
         # Lookup table to get section list from name
         self._lists = OrderedDict((('head', []), ('body', []), ('foot', [])))
         # Reset attributes modified by reading
@@ -348,12 +618,318 @@ class Translator(nodes.NodeVisitor):
         # Flag for whether to escape characters
         self._escape_text = True
 
+        # Escaper for the current context, and those of enclosing contexts
+        self._escaper = get_escaper(ESCAPE_CHARS)
+        self._escapers = []
+        # Escaper for text written as is otherwise, e.g. in code spans, if
+        # any
+        self._raw_escaper = None
+
+        # Text not yet added to the output, and the Escaper for it.  Runs of
+        # text nodes are escaped and added at once.
+        self._text_run = []
+        self._run_escaper = None
+
+        # URLs of the references being written, None for references that are
+        # passed through
+        self._reference_urls = []
+
+        # OutputSink to stream finished blocks to, if any
+        self.sink = None
+        # OffsetIndex recording where sections start in the stream, if any
+        self.index = None
+        # Whether to free the subtrees of blocks once written to the sink
+        self.free_nodes = False
+        # Whether the head section has already been written to the sink
+        self._sink_in_body = False
+
     def astext(self):
         """Return the final formatted document as a string."""
+        if self._text_run:
+            self.flush_text()
         parts = [''.join(lines).strip() for lines in self._lists.values()]
         parts = [part + '\n\n' for part in parts if part]
         return ''.join(parts).strip() + '\n'
 
+    def flush(self, everything=False):
+        """Write finished body output to the sink, if streaming.
+
+        Unless `everything` is true, the last body chunk is kept back, as
+        visitors may still inspect or rewrite it, e.g. :meth:`ensure_eol`.
+        """
+        if self.sink is None or self.indent_levels:
+            return
+        if self._text_run:
+            self.flush_text()
+        if len(self.body) < (1 if everything else 2):
+            return
+        if not self._sink_in_body:
+            # The docinfo of the head always precedes the body
+            for text in self.head:
+                self.sink.write(text)
+            self.head[:] = []
+            self.sink.start_part()
+            self._sink_in_body = True
+        kept = [] if everything else [self.body.pop()]
+        for text in self.body:
+            self.sink.write(text)
+        self.body[:] = kept
+        self.sink.commit()
+
+    def close(self):
+        """Write all remaining output to the sink and close it."""
+        if self._text_run:
+            self.flush_text()
+        sections = list(self._lists.values())
+        if self._sink_in_body:
+            sections = sections[1:]
+        for lines in sections:
+            for text in lines:
+                self.sink.write(text)
+            lines[:] = []
+            self.sink.start_part()
+        self.sink.close()
+
+    def resolve_handlers(self, cls):
+        """Return the visit and depart handlers for nodes of class `cls`."""
+        name = cls.__name__
+        return (
+            getattr(self, 'visit_' + name, self.unknown_visit),
+            getattr(self, 'depart_' + name, self.unknown_departure),
+        )
+
+    def get_handlers(self, cls):
+        """Return the visit and depart handlers for nodes of class `cls`.
+
+        Handlers are resolved once per node class and translator, so handlers
+        set on the instance, as Sphinx does for extension nodes, are used.
+        """
+        try:
+            return self._handlers[cls]
+        except KeyError:
+            handlers = self.resolve_handlers(cls)
+            if self.fragments is not None and issubclass(
+                cls, self.fragment_nodes
+            ):
+                handlers = self._fragment_handlers(*handlers)
+            self._handlers[cls] = handlers
+            return handlers
+
+    def _fragment_handlers(self, visit, depart):
+        """Wrap `visit` and `depart` to reuse or cache rendered subtrees."""
+        def visit_fragment(node):
+            seed, key = self.fragment_key(node)
+            cached = self.fragments.get(key)
+            if cached is not None:
+                items, state = cached
+                self.add_fragment(items)
+                self.restore_fragment_state(state)
+                # Warn as if the subtree was walked
+                for node_type in state['unsupported']:
+                    self.warn_unsupported(node_type)
+                raise nodes.SkipNode
+            self.start_fragment(seed, key)
+            try:
+                visit(node)
+            except (nodes.SkipNode, nodes.SkipDeparture, nodes.SkipSiblings):
+                # There will be no departure to finish the fragment in
+                self.finish_fragment(store=False)
+                raise
+
+        def depart_fragment(node):
+            try:
+                depart(node)
+            except BaseException:
+                self.finish_fragment(store=False)
+                raise
+            self.finish_fragment(store=True)
+
+        return visit_fragment, depart_fragment
+
+    def fragment_context(self):
+        """Return the state of the translator the output of a subtree
+        depends on, besides the subtree itself."""
+        return (
+            self.section_level,
+            tuple(self.list_prefixes),
+            self._escape_text,
+            self._escaper.chars,
+            self._raw_escaper.chars if self._raw_escaper else None,
+            self._in_docinfo,
+            posixpath.dirname(self.builder.current_docname or '')
+            if self.builder else None,
+        )
+
+    def fragment_state(self):
+        """Return the state a subtree leaves the translator in."""
+        return {'escape_text': self._escape_text}
+
+    def restore_fragment_state(self, state):
+        self._escape_text = state['escape_text']
+
+    def fragment_key(self, node):
+        """Return the last character output so far and the fragment cache
+        key for the subtree of `node`."""
+        out = self.get_current_output()
+        # Visitors like ensure_eol look at the end of the output
+        seed = out[-1][-1] if out and out[-1] else ''
+        digest, self_reference = subtree_digest(
+            node, self._digests, self.unrendered_attributes,
+            self.fragment_nodes, self.flag_attributes
+        )
+        context = (seed, ) + self.fragment_context()
+        if self_reference:
+            context += (self.builder.current_docname, )
+        return seed, (digest, context)
+
+    def start_fragment(self, seed, key):
+        """Capture the output of a subtree to store it under `key`."""
+        level = IndentLevel([], '')
+        if seed:
+            level.append(seed)
+        self.indent_levels.append(level)
+        self._fragment_stack.append(
+            (key, level, seed, len(self._unsupported), self.side_effects)
+        )
+
+    def finish_fragment(self, store):
+        """Stop capturing the most recent fragment and add its output.
+
+        With `store`, the output goes to the fragment cache, too.
+        """
+        key, level, seed, unsupported, side_effects = (
+            self._fragment_stack.pop()
+        )
+        if self.side_effects != side_effects:
+            store = False
+        if self._text_run:
+            self.flush_text()
+        self.indent_levels.remove(level)
+        items = level.content
+        if seed:
+            if items[0] is not seed:
+                # The output before the fragment was rewritten
+                store = False
+            items = items[1:]
+        items = tuple(items)
+        if store:
+            state = self.fragment_state()
+            state['unsupported'] = tuple(
+                sorted(set(self._unsupported[unsupported:]))
+            )
+            self.fragments.put(key, items, state)
+        self.add_fragment(items)
+
+    def add_fragment(self, items):
+        """Add the captured output `items` of a fragment."""
+        out = self.get_current_output()
+        if isinstance(out, IndentLevel):
+            out.content.extend(items)
+        else:
+            # Lists get the text of levels written to them
+            out.extend(map(str, items))
+
+    def dispatch_visit(self, node):
+        return self.get_handlers(node.__class__)[0](node)
+
+    def dispatch_departure(self, node):
+        self.get_handlers(node.__class__)[1](node)
+        # Blocks directly in the document or a section are finished for good
+        if self.sink is not None and isinstance(
+            node.parent, (nodes.document, nodes.section)
+        ):
+            self.flush()
+
+    def walkabout(self, node):
+        """Visit and depart `node` and all nodes below it.
+
+        This is ``node.walkabout(self)``, including the handling of
+        ``SkipNode``, ``SkipDeparture``, ``SkipChildren``, ``SkipSiblings``
+        and ``StopTraversal``, but the tree is walked with an explicit stack
+        instead of recursion, so deeply nested documents do not run into the
+        recursion limit.
+
+        Return true if the traversal was stopped.
+        """
+        get_handlers = self.get_handlers
+        sink = self.sink
+        # Frames of the nodes being walked: [node, depart handler or None,
+        # iterator over remaining children, whether traversal stopped]
+        stack = []
+        while True:
+            visit, depart = get_handlers(node.__class__)
+            # Exception raised by the walk of `node`, to be handled by its
+            # parent, and whether it stopped the traversal
+            pruned = None
+            stop = False
+            try:
+                visit(node)
+            except nodes.SkipNode:
+                pass
+            except nodes.SkipDeparture:
+                stack.append([node, None, iter(node.children[:]), False])
+            except nodes.SkipChildren:
+                stack.append([node, depart, iter(()), False])
+            except nodes.StopTraversal:
+                stack.append([node, depart, iter(()), True])
+            except nodes.SkipSiblings as err:
+                pruned = err
+            else:
+                stack.append([node, depart, iter(node.children[:]), False])
+            while True:
+                if not stack:
+                    if pruned is not None:
+                        raise pruned
+                    return stop
+                frame = stack[-1]
+                if pruned is not None or stop:
+                    # Leave the remaining children of the parent alone
+                    frame[2] = iter(())
+                    if stop or isinstance(pruned, nodes.StopTraversal):
+                        frame[3] = True
+                    pruned = None
+                node = next(frame[2], None)
+                if node is not None:
+                    break
+                stack.pop()
+                node, depart, _, stop = frame
+                if depart is None:
+                    continue
+                try:
+                    depart(node)
+                except (
+                    nodes.SkipSiblings, nodes.SkipChildren,
+                    nodes.StopTraversal
+                ) as err:
+                    pruned = err
+                    stop = False
+                    continue
+                # Blocks directly in the document or a section are finished
+                # for good
+                if sink is not None and isinstance(
+                    node.parent, (nodes.document, nodes.section)
+                ):
+                    self.flush()
+                    if self.free_nodes and not self.indent_levels:
+                        self.free_subtree(node)
+
+    def free_subtree(self, node):
+        """Drop the descendants of `node`, which is written for good.
+
+        Children only keep their parents alive, not the other way round,
+        once all child lists are emptied, so the subtree is freed right
+        away rather than by the cycle collector.
+        """
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, nodes.Element):
+                stack.extend(node.children)
+                node.children = []
+        # Digests are keyed by the ids of nodes, which are reused once the
+        # nodes are freed
+        self._digests.clear()
+
     def ensure_eol(self):
         """Ensure the last line in current base is terminated by new line."""
         out = self.get_current_output()
@@ -362,6 +938,8 @@ class Translator(nodes.NodeVisitor):
 
     def get_current_output(self, section='body'):
         """Get list or IndentLevel to which we are currently writing."""
+        if self._text_run:
+            self.flush_text()
         return (
             self.indent_levels[-1]
             if self.indent_levels else self._lists[section]
@@ -394,31 +972,71 @@ class Translator(nodes.NodeVisitor):
         section : {'body', 'head', 'foot'}, optional
             Section of document that generated text should be appended to.
         """
+        if self._text_run:
+            self.flush_text()
         self._lists[section].append(string)
 
     def start_level(self, prefix, first_prefix=None, section='body'):
         """Create a new IndentLevel with `prefix` and `first_prefix`"""
-        base = (
-            self.indent_levels[-1].content
-            if self.indent_levels else self._lists[section]
-        )
+        base = self.get_current_output(section)
         level = IndentLevel(base, prefix, first_prefix)
         self.indent_levels.append(level)
 
     def finish_level(self):
         """Remove most recent IndentLevel and write contents."""
+        if self._text_run:
+            self.flush_text()
+        level = self.indent_levels.pop()
+        level.write()
+
+    def start_capture(self):
+        """Redirect output to a fresh buffer until :meth:`finish_capture`."""
+        if self._text_run:
+            self.flush_text()
+        self.indent_levels.append(IndentLevel([], ''))
+
+    def finish_capture(self):
+        """Stop the most recent capture and return the captured text."""
+        if self._text_run:
+            self.flush_text()
         level = self.indent_levels.pop()
         level.write()
+        return ''.join(level.base)
+
+    def push_escape(self, chars, raw=False):
+        """Escape `chars`, too, until the matching :meth:`pop_escape`.
+
+        With `raw`, `chars` are escaped even in text that is otherwise
+        written as is, such as code spans.
+        """
+        self._escapers.append((self._escaper, self._raw_escaper))
+        self._escaper = get_escaper(self._escaper.chars + chars)
+        if raw:
+            raw_chars = self._raw_escaper.chars if self._raw_escaper else ''
+            self._raw_escaper = get_escaper(raw_chars + chars)
+
+    def pop_escape(self):
+        self._escaper, self._raw_escaper = self._escapers.pop()
 
     def escape_chars(self, txt):
         # Escape (some) characters with special meaning for Markdown
-        return ESCAPE_RE.sub(r'\\\1', txt)
+        return self._escaper(txt)
+
+    def flush_text(self):
+        """Escape the pending run of text and add it to the output."""
+        text = ''.join(self._text_run).replace('\r\n', '\n')
+        self._text_run = []
+        if self._run_escaper is not None:
+            text = self._run_escaper(text)
+        self.add(text)
 
     def visit_Text(self, node):
-        text = node.astext().replace('\r\n', '\n')
-        if self._escape_text:
-            text = self.escape_chars(text)
-        self.add(text)
+        escaper = self._escaper if self._escape_text else self._raw_escaper
+        if self._text_run and escaper is not self._run_escaper:
+            self.flush_text()
+        self._run_escaper = escaper
+        # Only text with null escapes left over by the parser needs astext
+        self._text_run.append(node.astext() if '\x00' in node else node)
 
     def depart_Text(self, node):
         pass
@@ -539,8 +1157,25 @@ class Translator(nodes.NodeVisitor):
 
     def visit_section(self, node):
         self.section_level += 1
+        if self.index is not None:
+            # Write everything before the section, so the section starts
+            # at the next byte.  Sections start with their title, which
+            # does not look back at the preceding output.
+            self.flush(everything=True)
+            title = ''
+            if node.children and isinstance(node[0], nodes.title):
+                title = node[0].astext()
+            ids = node.get('ids')
+            self.index.start_section(
+                self.anchor_name(ids[0]) if ids else None,
+                title,
+                self.section_level
+            )
 
     def depart_section(self, node):
+        if self.index is not None:
+            self.flush(everything=True)
+            self.index.end()
         self.section_level -= 1
 
     def visit_enumerated_list(self, node):
@@ -579,13 +1214,16 @@ class Translator(nodes.NodeVisitor):
         raise nodes.SkipNode
 
     def visit_title(self, node):
+        self.push_escape(HEADING_CHARS)
         self.add((self.section_level + 1) * '#' + ' ')
 
     def depart_title(self, node):
+        self.pop_escape()
         self.ensure_eol()
         self.add('\n')
 
     def visit_subtitle(self, node):
+        self.push_escape(HEADING_CHARS)
         self.add((self.section_level + 2) * '#' + ' ')
 
     depart_subtitle = depart_title
@@ -605,16 +1243,12 @@ class Translator(nodes.NodeVisitor):
         if not node.get('internal'):
             return url
 
-        # If HTTP page build URL known, make link relative to that.
-        if self.markdown_http_base:
+        # Links to other documents come from the builder's get_relative_uri
+        # and are final already.  With an HTTP base, references within this
+        # doc link to its page, too.
+        if url == '' and self.markdown_http_base:
             this_doc = self.builder.current_docname
-            if url == '':  # Reference to this doc
-                url = self.builder.get_target_uri(this_doc)
-            else:  # URL is relative to the current docname.
-                this_dir = posixpath.dirname(this_doc)
-                if this_dir:
-                    url = posixpath.normpath('{}/{}'.format(this_dir, url))
-            url = '{}/{}'.format(self.markdown_http_base, url)
+            url = self.builder.get_relative_uri(this_doc, this_doc)
 
         # Whatever the URL is, add the anchor to it
         if 'refid' in node:
@@ -625,16 +1259,16 @@ class Translator(nodes.NodeVisitor):
     def visit_reference(self, node):
         # If no target possible, pass through.
         url = self._refuri2http(node)
-        if url is None:
-            return
-        self.add('[')
-        for child in node.children:
-            child.walkabout(self)
-        self.add(']({})'.format(url))
-        raise nodes.SkipNode
+        self._reference_urls.append(url)
+        if url is not None:
+            self.push_escape(LINK_TEXT_CHARS)
+            self.add('[')
 
     def depart_reference(self, node):
-        pass
+        url = self._reference_urls.pop()
+        if url is not None:
+            self.pop_escape()
+            self.add(']({})'.format(url))
 
     def visit_nbplot_epilogue(self, node):
         raise nodes.SkipNode
@@ -663,14 +1297,22 @@ class Translator(nodes.NodeVisitor):
         raise nodes.SkipNode
 
     def visit_download_reference(self, node):
-        # If not resolving internal links, or there is no filename specified,
-        # pass through.
+        # If there is no filename specified, or the file is neither copied
+        # nor linked on the HTTP base, pass through.
         filename = node.get('filename')
-        if None in (self.markdown_http_base, filename):
+        if filename is None:
+            return
+        if self.markdown_http_base:
+            target_url = '{}/_downloads/{}'.format(
+                self.markdown_http_base, filename
+            )
+        elif self.markdown_copy_assets:
+            target_url = self.builder.get_asset_uri(
+                self.builder.current_docname,
+                posixpath.join('_downloads', quote(filename))
+            )
+        else:
             return
-        target_url = '{}/_downloads/{}'.format(
-            self.markdown_http_base, filename
-        )
         self.add('[{}]({})'.format(node.astext(), target_url))
         raise nodes.SkipNode
 
@@ -696,13 +1338,23 @@ class Translator(nodes.NodeVisitor):
             self.process_docinfo_item(node)
             return
         # We really don't know this node type, warn once per node type
-        node_type = node.__class__.__name__
+        self.warn_unsupported(node.__class__.__name__)
+        raise nodes.SkipNode
+
+    def anchor_name(self, node_id):
+        """Return the name of the anchor of the element with `node_id`."""
+        return node_id
+
+    def warn_unsupported(self, node_type):
+        self._unsupported.append(node_type)
         if node_type not in self._warned:
-            self.document.reporter.warning(
-                'The ' + node_type + ' element not yet supported in Markdown.'
-            )
+            report_unsupported(self.document, node_type)
             self._warned.add(node_type)
-        raise nodes.SkipNode
+
+    @property
+    def unsupported(self):
+        """Names of the unsupported node types met, in order of appearance."""
+        return list(OrderedDict.fromkeys(self._unsupported))
 
 class Writer(writers.Writer):
 
@@ -712,6 +1364,9 @@ class Writer(writers.Writer):
     output = None
     """Final translated form of `document`."""
 
+    unsupported = ()
+    """Names of the unsupported node types met while translating."""
+
     # Add configuration settings for additional Markdown flavours here.
     settings_spec = (
         'Markdown-Specific Options', None, (
@@ -739,7 +1394,36 @@ class Writer(writers.Writer):
         writers.Writer.__init__(self)
         self.builder = builder
 
+    def create_translator(self, document):
+        visitor = self.builder.create_translator(document, self.builder)
+        visitor.fragments = getattr(self.builder, 'fragments', None)
+        profile = getattr(self.builder, 'profile', None)
+        if profile is not None:
+            from .profiling import instrument
+            instrument(visitor, profile)
+        return visitor
+
     def translate(self):
-        visitor = self.builder.create_translator(self.document, self.builder)
-        self.document.walkabout(visitor)
+        visitor = self.create_translator(self.document)
+        visitor.walkabout(self.document)
         self.output = visitor.astext()
+        self.unsupported = visitor.unsupported
+
+    def write_stream(self, document, stream, index=None, free_nodes=False):
+        """Translate `document`, writing the output to `stream` as we go.
+
+        Unlike :meth:`write`, neither the whole output nor an encoded copy
+        of it is ever held in memory; `stream` receives one finished block at
+        a time.  With an OffsetIndex `index` that is or wraps `stream`, the
+        sections of the document are recorded in it.  With `free_nodes`, the
+        doctree is emptied as it is written, block by block.
+        """
+        self.document = document
+        visitor = self.create_translator(document)
+        visitor.sink = OutputSink(stream)
+        visitor.index = index
+        visitor.free_nodes = free_nodes
+        visitor.walkabout(document)
+        visitor.close()
+        self.output = None
+        self.unsupported = visitor.unsupported
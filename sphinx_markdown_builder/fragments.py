@@ -0,0 +1,100 @@
+from collections import OrderedDict
+import hashlib
+
+from docutils import nodes
+
+class FragmentCache(object):
+    """Rendered Markdown of doctree subtrees, shared by the documents of a
+    build.
+
+    Entries are keyed by a digest of the subtree and the translator state
+    its output depends on.  Least recently used entries are evicted once
+    the text held exceeds `max_size` characters.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[:2]
+
+    def put(self, key, items, state):
+        """Store output `items` and translator `state` after rendering."""
+        size = sum(len(item) for item in map(str, items))
+        if size > self.max_size:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= old[2]
+        self.entries[key] = (items, state, size)
+        self.size += size
+        while self.size > self.max_size:
+            _, old = self.entries.popitem(last=False)
+            self.size -= old[2]
+
+def subtree_digest(node, digests, ignored=(), nested=(), flags=()):
+    """Return a digest of the text and attributes of `node` and its subtree.
+
+    Also return whether the subtree references its own document, with an
+    empty internal ``refuri``.  Attributes in `ignored` do not count, of
+    those in `flags` only whether they are set.
+
+    Subtrees of `nested` node classes are digested on their own first, and
+    their digests stand in for them.  All digests are memoized in
+    `digests`, by node id, so every node is serialized only once.
+    """
+    pending = [node]
+    while pending:
+        root = pending[-1]
+        if id(root) in digests:
+            pending.pop()
+            continue
+        pieces = []
+        self_reference = False
+        missing = []
+        stack = [root]
+        while stack:
+            current = stack.pop()
+            if current is None:
+                pieces.append('\x01')
+            elif isinstance(current, nodes.Text):
+                pieces.append('\x02')
+                pieces.append(current)
+            elif current is not root and isinstance(current, nested):
+                known = digests.get(id(current))
+                if known is None:
+                    missing.append(current)
+                else:
+                    pieces.append(known[0].hex())
+                    self_reference = self_reference or known[1]
+            else:
+                pieces.append(current.tagname)
+                attributes = [(name, name in flags or value)
+                              for name, value in current.attributes.items()
+                              if value and name not in ignored]
+                if attributes:
+                    pieces.append(repr(attributes))
+                    if current.get('internal') and not current.get('refuri'):
+                        self_reference = True
+                stack.append(None)
+                stack.extend(reversed(current.children))
+        if missing:
+            # Come back once the nested subtrees are digested
+            pending.extend(missing)
+            continue
+        pending.pop()
+        digest = hashlib.blake2b(
+            '\x00'.join(pieces).encode('utf-8', 'surrogatepass'),
+            digest_size=16
+        )
+        digests[id(root)] = (digest.digest(), self_reference)
+    return digests[id(node)]
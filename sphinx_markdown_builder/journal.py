@@ -0,0 +1,73 @@
+from os import path
+import json
+import os
+import threading
+
+class Journal(object):
+    """Append-only record log shared by the main process and write workers.
+
+    Sphinx throws away whatever ``write_doc`` does to the builder in parallel
+    worker processes, so anything ``finish`` needs to know about written
+    documents is appended here instead.  Every process appends to its own
+    file, so records of different workers never interleave.
+    """
+    def __init__(self, dirname, name):
+        self.dirname = dirname
+        self.name = name
+        self._pid = None
+        self._file = None
+        self._lock = None
+
+    def _filenames(self):
+        prefix = self.name + '.'
+        try:
+            entries = os.listdir(self.dirname)
+        except OSError:
+            return []
+        return [
+            path.join(self.dirname, entry)
+            for entry in entries if entry.startswith(prefix)
+        ]
+
+    def append(self, record):
+        """Append `record`, which must be JSON serializable."""
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        if self._pid != os.getpid():
+            # First record of this process, possibly a freshly forked worker
+            # holding a copy of the parent's file and lock.
+            self._pid = os.getpid()
+            self._lock = threading.Lock()
+            os.makedirs(self.dirname, exist_ok=True)
+            self._file = open(
+                path.join(self.dirname, '{}.{}'.format(self.name, self._pid)),
+                'a',
+                encoding='utf-8'
+            )
+        with self._lock:
+            self._file.write(line)
+            # Workers exit without flushing their buffers
+            self._file.flush()
+
+    def records(self):
+        """Remove all journal files, yielding their records one at a time.
+
+        Unlike :meth:`collect`, this never holds more than one record in
+        memory, for journals of large records.
+        """
+        if self._file is not None and self._pid == os.getpid():
+            self._file.close()
+        self._pid = self._file = None
+        for filename in sorted(self._filenames()):
+            with open(filename, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            os.remove(filename)
+
+    def collect(self):
+        """Remove all journal files and return their records."""
+        return list(self.records())
+
+    def clear(self):
+        """Discard records left over by an interrupted build."""
+        self.collect()
@@ -0,0 +1,42 @@
+import posixpath
+from sphinx.util.osutil import relative_uri
+
+class LinkIndex(object):
+    """Links between documents, for the builder's ``get_relative_uri``.
+
+    The output paths of all documents are looked up once per build, and
+    every link is computed once per directory of the linking document and
+    target document.  Links are relative, so the output works offline and
+    when browsed on Git hosting, unless a `base` URL is given to make them
+    absolute URLs below it.
+    """
+    def __init__(self, get_target_uri, docnames, base=''):
+        self.get_target_uri = get_target_uri
+        self.base = base
+        # Output paths relative to the output directory, by docname
+        self.targets = {
+            docname: get_target_uri(docname) for docname in docnames
+        }
+        # Links by directory of the linking document and target docname
+        self._links = {}
+
+    def target(self, docname):
+        target = self.targets.get(docname)
+        if target is None:
+            # Not a document, e.g. ``genindex``
+            target = self.targets[docname] = self.get_target_uri(docname)
+        return target
+
+    def link(self, from_, to):
+        """Return the link from document `from_` to document `to`."""
+        if from_ == to and not self.base:
+            return ''
+        key = (posixpath.dirname(from_), to)
+        link = self._links.get(key)
+        if link is None:
+            if self.base:
+                link = '{}/{}'.format(self.base, self.target(to))
+            else:
+                link = relative_uri(self.target(from_), self.target(to))
+            self._links[key] = link
+        return link
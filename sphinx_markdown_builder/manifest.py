@@ -0,0 +1,101 @@
+from os import path
+import hashlib
+import json
+import os
+
+class OutputManifest(object):
+    """Content digests of the files written for each document.
+
+    Kept in the output directory, so unchanged output is not rewritten and
+    output of removed documents can be found and pruned.
+    """
+    filename = '.markdown-manifest.json'
+
+    def __init__(self, outdir):
+        self.path = path.join(outdir, self.filename)
+        self.digests = {}
+        # Times the output of each document was last confirmed current, its
+        # sources and dependencies are up to date unless newer than that
+        self.confirmed = {}
+        # Fingerprint of the configuration the output was written with
+        self.fingerprint = None
+        # Suffixes and level of the compressed siblings of the output
+        self.compression = None
+        # Bundle files, relative to the output directory
+        self.bundle = None
+        # Chunk file, relative to the output directory
+        self.chunks = None
+        # Digests of the sidecar files of spilled tables, by filename
+        # relative to the output directory, by docname
+        self.tables = {}
+
+    @staticmethod
+    def digest(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            self.digests = manifest['digests']
+            self.confirmed = manifest.get('confirmed', {})
+            self.fingerprint = manifest.get('fingerprint')
+            self.compression = manifest.get('compression')
+            self.bundle = manifest.get('bundle')
+            self.chunks = manifest.get('chunks')
+            self.tables = manifest.get('tables', {})
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            self.digests = {}
+            self.confirmed = {}
+            self.fingerprint = None
+            self.compression = None
+            self.bundle = None
+            self.chunks = None
+            self.tables = {}
+
+    def save(self):
+        os.makedirs(path.dirname(self.path), exist_ok=True)
+        tmpname = self.path + '.tmp'
+        with open(tmpname, 'w', encoding='utf-8') as f:
+            json.dump({
+                'fingerprint': self.fingerprint,
+                'compression': self.compression,
+                'bundle': self.bundle,
+                'chunks': self.chunks,
+                'digests': self.digests,
+                'confirmed': self.confirmed,
+                'tables': self.tables,
+            }, f, indent=1, sort_keys=True)
+        os.replace(tmpname, self.path)
+
+    def get(self, docname):
+        return self.digests.get(docname)
+
+    def update(self, docname, digest, confirmed=None):
+        self.digests[docname] = digest
+        if confirmed is not None:
+            self.confirmed[docname] = confirmed
+
+    def remove(self, docname):
+        self.digests.pop(docname, None)
+        self.confirmed.pop(docname, None)
+
+    def __iter__(self):
+        return iter(list(self.digests))
+
+class DigestWriter(object):
+    """Binary file wrapper encoding text and computing its manifest digest."""
+    def __init__(self, stream):
+        self.stream = stream
+        self.hash = hashlib.sha256()
+        # Number of bytes written
+        self.size = 0
+
+    def write(self, text):
+        data = text.encode('utf-8')
+        self.hash.update(data)
+        self.size += len(data)
+        self.stream.write(data)
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
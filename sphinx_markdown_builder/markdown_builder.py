@@ -1,14 +1,75 @@
+from . import __version__
+from .compat import findall, get_app
+from .fragments import FragmentCache
+from .journal import Journal
+from .links import LinkIndex
+from .doctree2md import report_unsupported
+from .manifest import DigestWriter, OutputManifest
 from .markdown_writer import MarkdownWriter, MarkdownTranslator
+from .offsets import OffsetIndex
+from .tables import TABLE_FORMATS, TableFile
+from .writer_pool import WriterPool
+from contextlib import nullcontext
+from docutils import nodes
 from docutils.io import StringOutput
-from io import open
+from functools import partial
+from io import BytesIO, open
 from os import path
+from pathlib import PurePath
+from urllib.parse import quote
+import hashlib
+import json
+import os
+import posixpath
+import time
 from sphinx.builders import Builder
 from sphinx.locale import __
 from sphinx.util import logging
-from sphinx.util.osutil import ensuredir, os_path
+from sphinx.util.osutil import ensuredir, os_path, relative_uri
 
 logger = logging.getLogger(__name__)
 
+MIB = 1 << 20
+
+def scan_outputs(outdir, suffix):
+    """Return the mtimes of all output files below `outdir`, by docname.
+
+    The whole tree is scanned once with ``os.scandir``, which is much cheaper
+    than a ``stat`` per document on large trees and network file systems.
+    Hidden directories, such as ``.doctrees``, are skipped.
+    """
+    mtimes = {}
+    pending = [(str(outdir), '')]
+    while pending:
+        dirname, prefix = pending.pop()
+        try:
+            entries = list(os.scandir(dirname))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                pending.append((entry.path, prefix + entry.name + '/'))
+            elif entry.name.endswith(suffix):
+                try:
+                    mtime = entry.stat().st_mtime
+                except OSError:
+                    continue
+                mtimes[prefix + entry.name[:-len(suffix)]] = mtime
+    return mtimes
+
+class NullTrace(object):
+    """Stands in for a BuildTrace while tracing is disabled, so that
+    ``tracing`` is only imported with ``markdown_trace``."""
+    enabled = False
+
+    def span(self, name, docname, **args):
+        return nullcontext({})
+
+    def mark(self):
+        pass
+
 class MarkdownBuilder(Builder):
     name = 'markdown'
     format = 'markdown'
@@ -17,54 +78,994 @@ class MarkdownBuilder(Builder):
     out_suffix = '.md'
     allow_parallel = True
     default_translator_class = MarkdownTranslator
+    supported_image_types = [
+        'image/svg+xml', 'image/png', 'image/gif', 'image/jpeg'
+    ]
 
     current_docname = None
+    # Digests of the output files of the last build, for builders that
+    # write a file per document
+    manifest = None
+    # Profile of the document being written, with ``markdown_profile``
+    profile = None
+    # Rendered subtrees reused between documents, if enabled
+    fragments = None
+    # Rendered documents reused between builds, if enabled
+    render_cache = None
+    # Links between documents, once writing starts
+    link_index = None
+    # Writes compressed siblings of the output files, if enabled
+    compressor = None
+    # JSON Lines files of all documents, if enabled
+    bundle = None
+    # JSON Lines file of the chunks of all documents, if enabled
+    chunk_file = None
+    # SQLite database of the sections of all documents, if enabled
+    sections_db = None
+    # Format of the sidecar files large tables are spilled to
+    table_format = 'csv'
+    # Digests of the sidecar files of the document being written, by
+    # filename relative to the output directory
+    table_files = None
 
-    markdown_http_base = 'https://localhost'
     insert_anchors_for_signatures = False
 
+    # Configuration values that do not change the output of documents, only
+    # how it is produced and reported on
+    unrendered_config = frozenset((
+        'markdown_profile', 'markdown_trace', 'markdown_memory_budget',
+        'markdown_writer_threads', 'markdown_fragment_cache_size',
+        'markdown_render_cache_size',
+    ))
+
     def init(self):
+        self.init_writing()
+        self.manifest = OutputManifest(self.outdir)
+        self.manifest.load()
+        get_app(self).connect('env-get-updated', self.removed_documents)
+        # Sources older than this were read by this build, at the latest
+        self.build_time = time.time()
+        # Digests of documents written by this build, possibly by workers
+        self.written = Journal(
+            path.join(self.doctreedir, 'markdown'), 'written'
+        )
+        self.written.clear()
+        # Sections of documents written by this build, with
+        # ``markdown_sections_db``
+        self.section_records = Journal(
+            path.join(self.doctreedir, 'markdown'), 'sections'
+        )
+        self.section_records.clear()
+        # Documents written by this build, with ``markdown_bundle``
+        self.bundled = Journal(
+            path.join(self.doctreedir, 'markdown'), 'bundle'
+        )
+        self.bundled.clear()
+        if self.config.markdown_bundle:
+            from .bundle import Bundle
+            self.bundle = Bundle(
+                path.join(self.outdir, self.config.markdown_bundle),
+                self.config.markdown_bundle_shards
+            )
+        # Chunks of documents written by this build, with ``markdown_chunks``
+        self.chunk_records = Journal(
+            path.join(self.doctreedir, 'markdown'), 'chunks'
+        )
+        self.chunk_records.clear()
+        if self.config.markdown_chunks:
+            from .chunks import ChunkFile
+            self.chunk_file = ChunkFile(
+                path.join(self.outdir, self.config.markdown_chunks)
+            )
+        if self.config.markdown_sections_db:
+            from .section_db import SectionDatabase
+            self.sections_db = SectionDatabase(
+                path.join(self.outdir, self.config.markdown_sections_db)
+            )
+        if self.config.markdown_render_cache_size > 0:
+            from .render_cache import RenderCache
+            self.render_cache = RenderCache(
+                path.join(self.doctreedir, 'markdown', 'render-cache'),
+                self.config.markdown_render_cache_size
+            )
+
+    def removed_documents(self, app, env):
+        """Return the root document if there is output of documents that
+        no longer exist.
+
+        Sphinx < 9 stops a build that read no documents before ``finish``,
+        which removes that output.  The root document lists the others, and
+        rewriting it is cheap if it has not changed.
+        """
+        root = self.config.root_doc
+        if root in env.found_docs and any(
+            docname not in env.found_docs for docname in self.manifest
+        ):
+            return [root]
+        return []
+
+    def init_writing(self):
+        """Set up what writing documents needs, besides the output files of
+        the last build."""
         self.secnumbers = {}
+        # Handler profiles of documents written by this build
+        self.profiled = Journal(
+            path.join(self.doctreedir, 'markdown'), 'profile'
+        )
+        self.profiled.clear()
+        # Spans of the build phases of all documents, with ``markdown_trace``
+        self.traced = Journal(path.join(self.doctreedir, 'markdown'), 'trace')
+        self.traced.clear()
+        self.trace = NullTrace()
+        if self.config.markdown_trace:
+            self.init_trace()
+        # Fragment cache hits and misses of documents written by this build
+        self.fragment_stats = Journal(
+            path.join(self.doctreedir, 'markdown'), 'fragments'
+        )
+        self.fragment_stats.clear()
+        # Peak memory allocated while writing documents, with
+        # ``markdown_memory_budget``
+        self.memory_peaks = Journal(
+            path.join(self.doctreedir, 'markdown'), 'memory'
+        )
+        self.memory_peaks.clear()
+        if self.config.markdown_compress:
+            self.init_compressor()
+        if self.config.markdown_table_format in TABLE_FORMATS:
+            self.table_format = self.config.markdown_table_format
+        else:
+            logger.warning(
+                __('unknown table format: %s'),
+                self.config.markdown_table_format
+            )
+
+    def init_trace(self):
+        """Trace the build phases of all documents to ``self.traced``."""
+        from .tracing import (
+            BuildTrace, trace_doctree_read, trace_doctree_resolved,
+            trace_source_read
+        )
+        self.trace = BuildTrace(self.traced)
+        app = get_app(self)
+        app.connect('source-read', trace_source_read)
+        app.connect('doctree-read', trace_doctree_read)
+        app.connect('doctree-resolved', trace_doctree_resolved)
+
+    def init_compressor(self):
+        """Set up the compressors of ``markdown_compress`` that are
+        available."""
+        from .compression import Compressor, load_compressor
+        compressors = []
+        for name in self.config.markdown_compress:
+            try:
+                compressors.append(
+                    load_compressor(name, self.config.markdown_compress_level)
+                )
+            except ValueError:
+                logger.warning(__('unknown compression format: %s'), name)
+            except ImportError as err:
+                logger.warning(
+                    __('%s compression is not available: %s'), name, err
+                )
+        if compressors:
+            self.compressor = Compressor(compressors)
+
+    def get_compression(self):
+        """Return the suffixes and level of compressed siblings, as kept in
+        the manifest."""
+        if self.compressor is None:
+            return None
+        return {
+            'suffixes': self.compressor.suffixes,
+            'level': self.config.markdown_compress_level,
+        }
+
+    def get_config_fingerprint(self):
+        """Return a digest of everything besides sources that affects output.
+
+        That is the versions of all loaded extensions, and the configuration
+        values that do not already make Sphinx re-read the environment.
+        Values that cannot be serialized reliably, e.g. functions, and
+        ``unrendered_config`` are left out.
+        """
+        app = get_app(self)
+        values = {
+            'extensions': sorted(
+                (name, str(extension.version))
+                for name, extension in app.extensions.items()
+            ),
+        }
+        for name, value, rebuild in self.config:
+            if rebuild == 'env' or name in self.unrendered_config:
+                continue
+            try:
+                values[name] = json.dumps(value, sort_keys=True)
+            except (TypeError, ValueError):
+                continue
+        data = json.dumps(values, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(data).hexdigest()
 
     def get_outdated_docs(self):
+        fingerprint = self.get_config_fingerprint()
+        if fingerprint != self.manifest.fingerprint or self.outputs_missing():
+            self.manifest.fingerprint = fingerprint
+            yield from self.env.found_docs
+            return
+        targets = scan_outputs(self.outdir, self.out_suffix)
+        # Included files and modules are often shared by many documents
+        mtimes = {}
+
+        def getmtime(filename):
+            if filename not in mtimes:
+                try:
+                    mtimes[filename] = path.getmtime(filename)
+                except EnvironmentError:
+                    mtimes[filename] = None
+            return mtimes[filename]
+
         for docname in self.env.found_docs:
-            if docname not in self.env.all_docs:
+            if docname not in self.env.all_docs or docname not in targets:
                 yield docname
                 continue
-            targetname = path.join(self.outdir, docname + self.out_suffix)
-            try:
-                targetmtime = path.getmtime(targetname)
-            except Exception:
-                targetmtime = 0
-            try:
-                srcmtime = path.getmtime(self.env.doc2path(docname))
-                if srcmtime > targetmtime:
+            # Unchanged output is not rewritten and keeps its mtime, so the
+            # time the output was last confirmed current counts, if known
+            targetmtime = self.manifest.confirmed.get(
+                docname, targets[docname]
+            )
+            srcmtime = getmtime(self.env.doc2path(docname))
+            if srcmtime is None:
+                continue
+            if srcmtime > targetmtime:
+                yield docname
+                continue
+            for dependency in self.env.dependencies.get(docname, ()):
+                depmtime = getmtime(path.join(self.srcdir, dependency))
+                # A dependency that disappeared changes the output, too
+                if depmtime is None or depmtime > targetmtime:
                     yield docname
-            except EnvironmentError:
-                pass
+                    break
+
+    def outputs_missing(self):
+        """Return whether an output covering all documents is missing, which
+        only a build of all documents can write again."""
+        if self.sections_db is not None and not self.sections_db.exists():
+            return True
+        filenames = []
+        if self.bundle is not None:
+            filenames.extend(self.bundle.filenames)
+        if self.chunk_file is not None:
+            filenames.append(self.chunk_file.filename)
+        return not all(map(path.isfile, filenames))
+
+    @property
+    def index_sections(self):
+        """Whether documents are written with an OffsetIndex recording their
+        sections."""
+        return self.sections_db is not None or self.chunk_file is not None
+
+    @property
+    def markdown_copy_assets(self):
+        """Whether images and downloadable files are copied to the output
+        directory, and linked there."""
+        return self.config.markdown_copy_assets
+
+    @property
+    def markdown_http_base(self):
+        """URL links to documents are made absolute against, '' for
+        relative links."""
+        return self.config.markdown_http_base.rstrip('/')
 
     def get_target_uri(self, docname: str, typ=None):
         # Returns the target markdown file name
         return f"{docname}.md"
 
+    def get_asset_uri(self, docname, filename):
+        """Return the link from `docname` to `filename`, relative to the
+        output directory."""
+        return relative_uri(self.get_target_uri(docname), filename)
+
+    def get_relative_uri(self, from_, to, typ=None):
+        if self.link_index is None:
+            return Builder.get_relative_uri(self, from_, to, typ)
+        return self.link_index.link(from_, to)
+
     def prepare_writing(self, docnames):
         self.writer = MarkdownWriter(self)
+        threads = self.config.markdown_writer_threads
+        if self.parallel_ok:
+            # Write workers are forked while writing, and forking a process
+            # with live threads that may hold locks can deadlock the child
+            threads = 0
+        self.writer_pool = WriterPool(threads, max_pending=4 * threads)
+        self.link_index = LinkIndex(
+            self.get_target_uri, self.env.all_docs, self.markdown_http_base
+        )
+        if self.config.markdown_fragment_cache_size > 0:
+            self.fragments = FragmentCache(
+                self.config.markdown_fragment_cache_size
+            )
+        if self.manifest is not None:
+            # Siblings written with other settings are stale, even if the
+            # output files they belong to are not
+            self.recompress = (
+                self.manifest.compression != self.get_compression()
+            )
+        if self.render_cache is not None:
+            self.render_fingerprint = '{}:{}'.format(
+                __version__, self.get_config_fingerprint()
+            )
+        self.trace.mark()
+
+    def write_doc_serialized(self, docname, doctree):
+        if self.markdown_copy_assets:
+            # Serialized, so the images to copy are known in the main
+            # process
+            self.post_process_images(doctree)
+            self.rewrite_image_uris(docname, doctree)
+        self.trace.mark()
+
+    def rewrite_image_uris(self, docname, doctree):
+        """Make the URIs of the images in `doctree` links to their copies.
+
+        The links become part of the doctree, and so of the keys of the
+        render and fragment caches.
+        """
+        for node in findall(doctree, nodes.image):
+            filename = self.images.get(node['uri'])
+            if filename is not None:
+                node['uri'] = self.get_asset_uri(
+                    docname, posixpath.join('_images', quote(filename))
+                )
 
     def write_doc(self, docname, doctree):
+        budget = self.config.markdown_memory_budget
+        if budget > 0:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
         self.current_docname = docname
         self.secnumbers = self.env.toc_secnumbers.get(docname, {})
-        destination = StringOutput(encoding='utf-8')
-        self.writer.write(doctree, destination)
-        outfilename = path.join(
-            self.outdir,
-            os_path(docname) + self.out_suffix
+        self.table_files = {}
+        fragments = self.fragments
+        if fragments is not None:
+            hits, misses = fragments.hits, fragments.misses
+        if not self.config.markdown_profile:
+            self.write_markdown(docname, doctree)
+        else:
+            from .profiling import DispatchProfile
+            self.profile = DispatchProfile()
+            try:
+                self.write_markdown(docname, doctree)
+            finally:
+                self.profiled.append({
+                    'docname': docname,
+                    'stats': self.profile.stats,
+                })
+                self.profile = None
+        if fragments is not None:
+            self.fragment_stats.append({
+                'hits': fragments.hits - hits,
+                'misses': fragments.misses - misses,
+            })
+        if budget > 0:
+            import tracemalloc
+            self.record_memory(
+                docname, tracemalloc.get_traced_memory()[1] - baseline, budget
+            )
+        self.trace.mark()
+
+    def record_memory(self, docname, peak, budget):
+        """Journal the `peak` memory allocated while writing `docname`, and
+        warn if it is over `budget`."""
+        self.memory_peaks.append({'docname': docname, 'peak': peak})
+        if peak > budget:
+            logger.warning(
+                __('writing allocated %.1f MiB at the peak, more than '
+                   'markdown_memory_budget (%.1f MiB)'),
+                peak / MIB, budget / MIB, location=docname
+            )
+
+    def get_render_key(self, docname, doctree):
+        """Return the render cache key of `doctree`, None to bypass the cache.
+
+        Profiling needs every document to be translated, so it bypasses the
+        cache, too.
+        """
+        if self.render_cache is None or self.config.markdown_profile:
+            return None
+        from .render_cache import doctree_digest
+        with self.trace.span('cache key', docname):
+            digest = doctree_digest(doctree)
+        return self.render_cache.key(self.render_fingerprint, docname, digest)
+
+    def write_markdown(self, docname, doctree):
+        key = self.get_render_key(docname, doctree)
+        if key is not None:
+            with self.trace.span('cache', docname) as args:
+                entry = self.render_cache.get(key)
+                args['hit'] = entry is not None
+            if entry is not None:
+                meta, data = entry
+                # Warn as if the document had been translated again
+                for node_type in meta['unsupported']:
+                    report_unsupported(doctree, node_type)
+                self.write_data(docname, data)
+                self.record_document(
+                    docname,
+                    self.get_links(docname, doctree),
+                    data,
+                    meta.get('sections')
+                )
+                return
+        if (
+            self.config.markdown_stream_output
+            or self.config.markdown_low_memory
+        ):
+            self.stream_doc(docname, doctree, key)
+            return
+        index = None
+        with self.trace.span('translate', docname):
+            if not self.index_sections:
+                destination = StringOutput(encoding='unicode')
+                output = self.writer.write(doctree, destination)
+            else:
+                # Streaming records where the sections start
+                buffer = BytesIO()
+                index = OffsetIndex(DigestWriter(buffer))
+                self.writer.write_stream(doctree, index, index)
+        with self.trace.span('encode', docname):
+            if index is None:
+                data = output.encode('utf-8')
+            else:
+                data = buffer.getvalue()
+        sections = index.sections if index is not None else None
+        # A cache hit would not write the sidecar files of spilled tables
+        if key is not None and not self.table_files:
+            self.render_cache.put(key, data, {
+                'unsupported': self.writer.unsupported,
+                'sections': sections,
+            })
+        self.write_data(docname, data)
+        self.record_document(
+            docname, self.get_links(docname, doctree), data, sections
         )
-        ensuredir(path.dirname(outfilename))
+
+    def get_links(self, docname, doctree):
+        """Return the outbound links of `doctree` for the bundle, None
+        without a bundle."""
+        if self.bundle is None:
+            return None
+        from .bundle import document_links
+        return document_links(doctree, self.get_target_uri(docname))
+
+    def record_document(self, docname, links, data, sections):
+        """Journal what the section database, the bundle and the chunk file
+        need of the document rendered to `data`, with the outbound `links`
+        of its doctree."""
+        if self.index_sections:
+            from .section_db import split_sections
+            title = self.env.titles.get(docname)
+            rows = split_sections(
+                data, title.astext() if title else '', sections
+            )
+            if self.sections_db is not None:
+                self.section_records.append({
+                    'docname': docname,
+                    'sections': rows,
+                })
+            if self.chunk_file is not None:
+                from .chunks import document_chunks
+                self.chunk_records.append({
+                    'docname': docname,
+                    'chunks': document_chunks(
+                        docname,
+                        self.get_document_uri(docname),
+                        rows,
+                        self.config.markdown_chunk_tokens
+                    ),
+                })
+        if self.bundle is not None:
+            self.record_bundle(docname, links, data)
+
+    def get_document_uri(self, docname):
+        """Return the URI of the output of `docname` in bundles and chunk
+        files, below ``markdown_http_base`` if set."""
+        uri = self.get_target_uri(docname)
+        base = self.markdown_http_base
+        return '{}/{}'.format(base, uri) if base else uri
+
+    def record_bundle(self, docname, links, data):
+        """Journal the bundle line of `docname`."""
+        title = self.env.titles.get(docname)
+        # A str before Sphinx 8
+        source = self.env.doc2path(docname, False)
+        self.bundled.append({
+            'docname': docname,
+            'title': title.astext() if title else '',
+            'uri': self.get_document_uri(docname),
+            'markdown': data.decode('utf-8'),
+            'links': links,
+            'source': PurePath(source).as_posix(),
+        })
+
+    def write_data(self, docname, data):
+        """Write the encoded Markdown `data` of `docname`, if it changed."""
+        with self.trace.span('digest', docname) as args:
+            digest = self.manifest.digest(data)
+            args['bytes'] = len(data)
+        outfilename = self.get_outfilename(docname)
+        # Recorded even if the write is skipped, the output is current
+        record = {
+            'docname': docname,
+            'digest': digest,
+            'confirmed': self.build_time,
+            'tables': self.table_files,
+        }
+        # Same bytes as on disk keep the file and its mtime untouched
+        changed = not (
+            self.manifest.get(docname) == digest and path.isfile(outfilename)
+        )
+        compress = self.needs_compression(outfilename, changed)
+        if not changed and not compress:
+            self.written.append(record)
+            return
+
+        def write():
+            # In a thread of the writer pool, unless writing right away
+            with self.trace.span('write', docname):
+                if changed:
+                    self.writer_pool.write_file(outfilename, data)
+                if compress:
+                    self.compressor.compress(outfilename, data)
+
+        try:
+            # Only waits for the write if the writer pool is busy
+            with self.trace.span('submit', docname):
+                self.writer_pool.submit(
+                    outfilename, write, lambda: self.written.append(record)
+                )
+        except (IOError, OSError) as err:
+            logger.warning(__('error writing file %s: %s'), outfilename, err)
+
+    def needs_compression(self, outfilename, changed):
+        """Return whether the compressed siblings of `outfilename` have to be
+        written, `changed` tells whether the output file itself changed."""
+        return self.compressor is not None and (
+            changed or self.recompress or self.compressor.missing(outfilename)
+        )
+
+    def stream_doc(self, docname, doctree, key=None):
+        """Write `doctree` to its output file while it is being translated.
+
+        Output goes to a temporary file that replaces the previous output
+        only if its digest differs, so unchanged files keep their mtime.
+        With a render cache `key`, the output is stored in the cache, too.
+        With ``markdown_low_memory``, `doctree` is emptied while it is
+        written.
+        """
+        index = None
+        # Before the doctree is gone
+        links = self.get_links(docname, doctree)
+        outfilename = self.get_outfilename(docname)
+        tmpfilename = outfilename + '.tmp'
+        self.writer_pool.ensuredir(path.dirname(outfilename))
         try:
-            with open(outfilename, 'w', encoding='utf-8') as f:  # type: ignore
-                f.write(self.writer.output)
+            # Translation, encoding and output are interleaved when
+            # streaming, so they are traced as a single span.
+            with self.trace.span('stream', docname) as args:
+                with open(tmpfilename, 'wb', buffering=1 << 16) as f:
+                    stream = DigestWriter(f)
+                    if self.index_sections:
+                        index = OffsetIndex(stream)
+                    self.writer.write_stream(
+                        doctree,
+                        stream if index is None else index,
+                        index,
+                        free_nodes=self.config.markdown_low_memory
+                    )
+                args['bytes'] = stream.size
+            digest = stream.hexdigest()
+            sections = index.sections if index is not None else None
+            if key is not None and not self.table_files:
+                self.render_cache.put_file(key, tmpfilename, {
+                    'unsupported': self.writer.unsupported,
+                    'sections': sections,
+                })
+            if index is not None or self.bundle is not None:
+                # Section rows and bundle lines hold the Markdown, read back
+                # from the output rather than kept in memory while streaming
+                with open(tmpfilename, 'rb') as f:
+                    data = f.read()
+                self.record_document(docname, links, data, sections)
+            changed = not (
+                self.manifest.get(docname) == digest
+                and path.isfile(outfilename)
+            )
+            if changed:
+                os.replace(tmpfilename, outfilename)
+            else:
+                os.remove(tmpfilename)
+            if self.needs_compression(outfilename, changed):
+                with open(outfilename, 'rb') as f:
+                    self.compressor.compress(outfilename, f.read())
         except (IOError, OSError) as err:
             logger.warning(__('error writing file %s: %s'), outfilename, err)
+            if path.exists(tmpfilename):
+                os.remove(tmpfilename)
+            return
+        self.written.append({
+            'docname': docname,
+            'digest': digest,
+            'confirmed': self.build_time,
+            'tables': self.table_files,
+        })
+
+    def get_outfilename(self, docname):
+        return path.join(self.outdir, os_path(docname) + self.out_suffix)
+
+    def open_table_file(self):
+        """Return a TableFile for the next table of the current document
+        that is spilled, None if it cannot be created."""
+        docname = self.current_docname
+        filename = '{}.table-{}{}'.format(
+            docname,
+            len(self.table_files) + 1,
+            TABLE_FORMATS[self.table_format].suffix
+        )
+        self.table_files[filename] = None
+        outfilename = path.join(self.outdir, os_path(filename))
+        previous = None
+        if self.manifest is not None:
+            previous = self.manifest.tables.get(docname, {}).get(filename)
+        try:
+            self.writer_pool.ensuredir(path.dirname(outfilename))
+            return TableFile(outfilename, self.table_format, previous)
+        except (IOError, OSError) as err:
+            logger.warning(
+                __('error writing file %s: %s'), outfilename, err,
+                location=docname
+            )
+            del self.table_files[filename]
+            return None
+
+    def close_table_file(self, table_file):
+        """Finish `table_file` and return the link to it from the current
+        document, None if it could not be written."""
+        docname = self.current_docname
+        filename = path.relpath(table_file.filename, self.outdir)
+        filename = filename.replace(os.sep, '/')
+        try:
+            self.table_files[filename] = table_file.close()
+        except (IOError, OSError) as err:
+            logger.warning(
+                __('error writing file %s: %s'), table_file.filename, err,
+                location=docname
+            )
+            table_file.discard()
+            return None
+        if self.markdown_http_base:
+            return '{}/{}'.format(self.markdown_http_base, quote(filename))
+        return self.get_asset_uri(docname, quote(filename))
+
+    def update_table_files(self, docname, table_files):
+        """Record the sidecar files of `docname` written by this build,
+        removing those of earlier builds it no longer has."""
+        previous = self.manifest.tables.get(docname, {})
+        self.remove_files(
+            path.join(self.outdir, os_path(filename))
+            for filename in sorted(set(previous) - set(table_files))
+        )
+        if table_files:
+            self.manifest.tables[docname] = table_files
+        else:
+            self.manifest.tables.pop(docname, None)
+
+    def prune_outputs(self):
+        """Remove the output of documents that no longer exist, and
+        compressed siblings no longer enabled."""
+        old = set((self.manifest.compression or {}).get('suffixes', ()))
+        new = set((self.get_compression() or {}).get('suffixes', ()))
+        for docname in self.manifest:
+            outfilename = self.get_outfilename(docname)
+            if docname in self.env.found_docs:
+                self.remove_files(
+                    outfilename + suffix for suffix in old - new
+                )
+                continue
+            if not self.remove_files(
+                outfilename + suffix for suffix in [''] + sorted(old | new)
+            ):
+                continue
+            self.update_table_files(docname, {})
+            self.manifest.remove(docname)
+        self.manifest.compression = self.get_compression()
+
+    def remove_files(self, filenames):
+        """Remove `filenames` and return whether all are gone."""
+        removed = True
+        for filename in filenames:
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+            except OSError as err:
+                logger.warning(__('error removing file %s: %s'), filename, err)
+                removed = False
+        return removed
+
+    def copy_asset_files(self):
+        """Copy the images of the documents written by this build, and all
+        downloadable files, with the writer pool.
+
+        Files that are not images or downloadable files of any document
+        are removed from ``_images`` and ``_downloads`` first.
+        """
+        if not self.markdown_copy_assets:
+            return
+        from .assets import copy_asset, prune_assets
+        # Before copying, which writes temporary files there
+        for dirname, keep in [
+            ('_images', set(
+                filename for _, filename in self.env.images.values()
+            )),
+            ('_downloads', set(
+                filename for _, filename in self.env.dlfiles.values()
+            )),
+        ]:
+            try:
+                prune_assets(path.join(self.outdir, dirname), keep)
+            except OSError as err:
+                logger.warning(__('error removing file %s: %s'), dirname, err)
+        hardlink = self.config.markdown_hardlink_assets
+        assets = [
+            (src, posixpath.join('_images', filename))
+            for src, filename in self.images.items()
+        ] + [
+            (src, posixpath.join('_downloads', filename))
+            for src, (_, filename) in self.env.dlfiles.items()
+        ]
+        for src, filename in assets:
+            src = path.join(self.srcdir, src)
+            dest = path.join(self.outdir, os_path(filename))
+            self.writer_pool.ensuredir(path.dirname(dest))
+            self.writer_pool.submit(
+                dest, partial(copy_asset, src, dest, hardlink), lambda: None
+            )
+
+    def join_writer_pool(self):
+        """Wait for the writer pool and warn about failed writes."""
+        for filename, err in self.writer_pool.join():
+            logger.warning(__('error writing file %s: %s'), filename, err)
 
     def finish(self):
-        pass
+        self.copy_asset_files()
+        self.join_writer_pool()
+        for record in self.written.collect():
+            self.manifest.update(
+                record['docname'], record['digest'], record['confirmed']
+            )
+            self.update_table_files(record['docname'], record['tables'])
+        self.prune_outputs()
+        self.write_bundle()
+        self.write_chunks()
+        self.manifest.save()
+        if self.render_cache is not None:
+            self.render_cache.prune()
+        if self.sections_db is not None:
+            self.write_sections_db()
+        self.write_reports()
+
+    def write_bundle(self):
+        """Write the documents of this build to the bundle, along with those
+        of the previous bundle that are still current.
+
+        Bundle files of earlier builds that are not part of this one, e.g.
+        with fewer shards or the bundle disabled, are removed.
+        """
+        previous = [
+            path.join(self.outdir, filename)
+            for filename in self.manifest.bundle or ()
+        ]
+        self.manifest.bundle = None
+        if self.bundle is None:
+            self.remove_files(previous)
+            self.bundled.clear()
+            return
+        filenames = self.bundle.filenames
+        try:
+            written, copied = self.bundle.update(
+                self.bundled.records(), self.env.found_docs, previous
+            )
+        except (IOError, OSError, ValueError) as err:
+            logger.warning(
+                __('error writing file %s: %s'), self.bundle.filename, err
+            )
+            # Without the documents of this build, the next one has to start
+            # over
+            self.remove_files(previous + filenames)
+            return
+        self.manifest.bundle = [
+            path.relpath(filename, self.outdir) for filename in filenames
+        ]
+        logger.info(
+            __('%d documents written and %d kept in %s'),
+            written, copied, self.bundle.filename
+        )
+
+    def write_chunks(self):
+        """Write the chunks of the documents of this build to the chunk
+        file, along with those of the previous one that are still current.
+
+        Next to it, ``<name>.changes.json`` lists the IDs of the chunks
+        added and removed by this build.
+        """
+        previous = self.manifest.chunks
+        if previous is not None:
+            previous = path.join(self.outdir, previous)
+        self.manifest.chunks = None
+        if self.chunk_file is None:
+            if previous is not None:
+                from .chunks import changes_filename
+                self.remove_files([previous, changes_filename(previous)])
+            self.chunk_records.clear()
+            return
+        from .chunks import changes_filename, read_chunk_ids
+        filename = self.chunk_file.filename
+        try:
+            old = read_chunk_ids(previous) if previous is not None else set()
+            written, copied = self.chunk_file.update(
+                self.chunk_records.records(),
+                self.env.found_docs,
+                [previous] if previous is not None else []
+            )
+            new = read_chunk_ids(filename)
+            with open(
+                changes_filename(filename), 'w', encoding='utf-8'
+            ) as f:
+                json.dump({
+                    'added': sorted(new - old),
+                    'removed': sorted(old - new),
+                }, f, indent=1)
+        except (IOError, OSError, ValueError) as err:
+            logger.warning(__('error writing file %s: %s'), filename, err)
+            # Without the chunks of this build, the next one has to start
+            # over
+            self.remove_files([filename, changes_filename(filename)])
+            return
+        self.manifest.chunks = path.relpath(filename, self.outdir)
+        logger.info(
+            __('%d chunks in %s, %d added and %d removed'),
+            len(new), filename, len(new - old), len(old - new)
+        )
+
+    def write_sections_db(self):
+        """Write the sections of the documents of this build to the section
+        database, and remove those of documents that no longer exist."""
+        import sqlite3
+        filename = self.sections_db.filename
+        try:
+            written, searchable = self.sections_db.update(
+                self.section_records.records(), self.env.found_docs
+            )
+        except (sqlite3.Error, OSError) as err:
+            logger.warning(__('error writing file %s: %s'), filename, err)
+            # Without the rows of this build, the next one has to start over
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+            return
+        if not searchable:
+            logger.warning(
+                __('SQLite lacks FTS5, %s has no full text index'), filename
+            )
+        logger.info(
+            __('sections of %d documents written to %s'), written, filename
+        )
+
+    def write_reports(self):
+        """Write the profile and trace, if enabled, and log cache and memory
+        stats."""
+        if self.config.markdown_profile:
+            self.write_profile()
+        if self.config.markdown_trace:
+            self.write_trace()
+        self.report_fragments()
+        self.report_memory()
+
+    def report_memory(self):
+        """Log the documents that allocated the most memory while being
+        written, with ``markdown_memory_budget``."""
+        peaks = self.memory_peaks.collect()
+        if self.config.markdown_memory_budget > 0:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+        if not peaks:
+            return
+        peaks.sort(key=lambda record: record['peak'], reverse=True)
+        logger.info(__('largest memory peaks while writing:'))
+        for record in peaks[:10]:
+            logger.info(
+                '    %8.1f MiB  %s', record['peak'] / MIB, record['docname']
+            )
+
+    def report_fragments(self):
+        """Log the hit rate of the fragment caches of all processes."""
+        hits = misses = 0
+        for record in self.fragment_stats.collect():
+            hits += record['hits']
+            misses += record['misses']
+        if hits + misses:
+            logger.info(
+                __('fragment cache: %d hits, %d misses (%.1f%% hit rate)'),
+                hits, misses, 100.0 * hits / (hits + misses)
+            )
+
+    def write_profile(self):
+        """Write the handler profiles of all documents as one JSON report."""
+        from .profiling import DispatchProfile
+        profile = DispatchProfile()
+        docnames = set()
+        for record in self.profiled.collect():
+            docnames.add(record['docname'])
+            profile.merge(record['stats'])
+        report = profile.report()
+        report['documents'] = len(docnames)
+        filename = path.join(self.outdir, self.config.markdown_profile)
+        try:
+            ensuredir(path.dirname(filename))
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+        except (IOError, OSError) as err:
+            logger.warning(__('error writing file %s: %s'), filename, err)
+            return
+        logger.info(
+            __('handler profile of %d documents written to %s'),
+            len(docnames), filename
+        )
+
+    def write_trace(self):
+        """Write the traced spans as Chrome trace event JSON.
+
+        The trace can be opened with ``chrome://tracing`` or Perfetto.
+        The slowest and the largest documents are logged, too.
+        """
+        from .tracing import summarize
+        events = self.traced.collect()
+        main = os.getpid()
+        pids = sorted(set(event['pid'] for event in events))
+        for pid in pids:
+            events.append({
+                'name': 'process_name',
+                'ph': 'M',
+                'pid': pid,
+                'args': {
+                    'name': 'main' if pid == main else 'worker {}'.format(pid)
+                },
+            })
+        summary = summarize(events)
+        filename = path.join(self.outdir, self.config.markdown_trace)
+        try:
+            ensuredir(path.dirname(filename))
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'traceEvents': events,
+                    'displayTimeUnit': 'ms',
+                    'otherData': summary,
+                }, f)
+        except (IOError, OSError) as err:
+            logger.warning(__('error writing file %s: %s'), filename, err)
+            return
+        logger.info(__('build trace written to %s'), filename)
+        logger.info(__('slowest documents:'))
+        for item in summary['slowest']:
+            logger.info(
+                '    %8.1f ms  %s', item['seconds'] * 1e3, item['docname']
+            )
+        logger.info(__('largest documents:'))
+        for item in summary['largest']:
+            logger.info('    %8d B   %s', item['bytes'], item['docname'])
@@ -1,40 +1,70 @@
 from .depth import Depth
-from .doctree2md import Translator, Writer
+from .doctree2md import (
+    HEADING_CHARS, LINK_TEXT_CHARS, TABLE_CELL_CHARS, Translator, Writer,
+    get_escaper
+)
+from .tables import TableLayout
 from docutils import nodes
-from pydash import _
-import html2text
 import os
-import sys
+from sphinx import addnodes
 
-h = html2text.HTML2Text()
+# What render_signature makes of a node, by the kind of its handlers
+(
+    SIG_TEXT, SIG_PASS, SIG_ANNOTATION, SIG_NAME, SIG_PARAMETER,
+    SIG_REFERENCE, SIG_UNKNOWN
+) = range(7)
 
+# Output after the subtree of a signature node, by kind
+SIGNATURE_SUFFIXES = {
+    SIG_ANNOTATION: '_ ',
+    SIG_NAME: '(',
+    SIG_PARAMETER: ', ',
+}
 
 class MarkdownTranslator(Translator):
-    depth = Depth()
-    enumerated_count = {}
-    table_entries = []
-    table_rows = []
-    tables = []
-    tbodys = []
-    theads = []
+    fragment_nodes = (
+        addnodes.desc, nodes.Admonition, nodes.field_list, nodes.table
+    )
+    # Signatures name their object, but only the signature text is written,
+    # so inherited members of different classes share fragments.  Methods
+    # get a lower heading than other objects, hence the class flag.
+    unrendered_attributes = Translator.unrendered_attributes | frozenset((
+        'module', 'fullname', '_toc_parts', '_toc_name'
+    ))
+    flag_attributes = frozenset(('class', ))
 
     def __init__(self, document, builder=None):
-        Translator.__init__(self, document, builder=None)
-        self.builder = builder
+        Translator.__init__(self, document, builder)
+        if builder is not None and builder.insert_anchors_for_signatures:
+            self.unrendered_attributes = self.unrendered_attributes - {'ids'}
+        # Kinds of signature nodes for render_signature, by node class
+        self._signature_kinds = {}
+
+    def reset(self):
+        Translator.reset(self)
+        # Nesting depth of lists and other named elements
+        self.depth = Depth()
+        # Number of the last item of enumerated lists, by list depth
+        self.enumerated_count = {}
+        # Layouts of the tables being walked, innermost last
+        self.tables = []
+
+    def fragment_context(self):
+        return Translator.fragment_context(self) + (
+            self.depth.depth,
+            tuple(sorted(self.depth.sub_depth.items())),
+            tuple(sorted(self.enumerated_count.items())),
+            bool(self.tables),
+        )
 
-    @property
-    def rows(self):
-        rows = []
-        if not len(self.tables):
-            return rows
-        for node in self.tables[len(self.tables) - 1].children:
-            if isinstance(node, nodes.row):
-                rows.append(node)
-            else:
-                for node in node.children:
-                    if isinstance(node, nodes.row):
-                        rows.append(node)
-        return rows
+    def fragment_state(self):
+        state = Translator.fragment_state(self)
+        state['enumerated_count'] = dict(self.enumerated_count)
+        return state
+
+    def restore_fragment_state(self, state):
+        Translator.restore_fragment_state(self, state)
+        self.enumerated_count = dict(state['enumerated_count'])
 
     def visit_document(self, node):
         pass
@@ -43,6 +73,7 @@ class MarkdownTranslator(Translator):
         pass
 
     def visit_title(self, node):
+        self.push_escape(HEADING_CHARS)
         self.add((self.section_level) * '#' + ' ')
 
     def visit_desc(self, node):
@@ -71,9 +102,6 @@ class MarkdownTranslator(Translator):
 
     def visit_desc_name(self, node):
         # name of the class/method
-        # Escape "__" which is a formating string for markdown
-        if node.rawsource.startswith("__"):
-            self.add('\\')
         pass
 
     def depart_desc_name(self, node):
@@ -90,11 +118,15 @@ class MarkdownTranslator(Translator):
 
     def visit_desc_signature(self, node):
         # the main signature of class/method
+        output = self.render_signature(node)
+        if output is not None:
+            self.add(output)
+            raise nodes.SkipNode
 
         # Insert anchors if enabled by the builder
         if self.builder.insert_anchors_for_signatures:
             for sig_id in node.get("ids", ()):
-                self.add('<a name="{}"></a>'.format(sig_id))
+                self.add('<a name="{}"></a>'.format(self.anchor_name(sig_id)))
 
         # We dont want methods to be at the same level as classes,
         # If signature has a non null class, thats means it is a signature
@@ -103,11 +135,125 @@ class MarkdownTranslator(Translator):
             self.add('\n#### ')
         else:
             self.add('\n### ')
+        self.push_escape(HEADING_CHARS)
 
     def depart_desc_signature(self, node):
         # the main signature of class/method
+        self.pop_escape()
         self.add(')\n')
 
+    def signature_kind(self, cls):
+        """Return the kind of the handlers of nodes of class `cls`, None if
+        render_signature does not know their output."""
+        try:
+            return self._signature_kinds[cls]
+        except KeyError:
+            pass
+        visit, depart = self.resolve_handlers(cls)
+        # Handlers set on the instance or instrumented for profiling are
+        # not plain methods
+        handlers = (
+            getattr(visit, '__func__', None),
+            getattr(depart, '__func__', None),
+        )
+        if handlers[0] is Translator.unknown_visit:
+            kind = SIG_UNKNOWN
+        else:
+            kind = SIGNATURE_HANDLERS.get(handlers)
+        self._signature_kinds[cls] = kind
+        return kind
+
+    def render_signature(self, node):
+        """Return the Markdown of the ``desc_signature`` `node`, rendered in
+        a single pass over its subtree, None if it holds nodes only their
+        handlers can render.
+
+        The output is what walking the subtree gives, text is escaped in
+        the same runs the handlers would add it in.  Unsupported nodes are
+        reported once the whole subtree is known to be renderable.
+        """
+        signature_kind = self.signature_kind
+        if self._in_docinfo or signature_kind(nodes.Text) != SIG_TEXT:
+            return None
+        escape_text = self._escape_text
+        raw_escaper = self._raw_escaper
+        escaper = get_escaper(self._escaper.chars + HEADING_CHARS)
+        pieces = []
+        if self.builder.insert_anchors_for_signatures:
+            for sig_id in node.get('ids', ()):
+                pieces.append(
+                    '<a name="{}"></a>'.format(self.anchor_name(sig_id))
+                )
+        pieces.append(
+            '\n#### ' if node.attributes.get('class') else '\n### '
+        )
+        # Text not added yet, as in the text runs of the translator
+        run = []
+
+        def add(piece):
+            if run:
+                text = ''.join(run).replace('\r\n', '\n')
+                if escape_text:
+                    text = escaper(text)
+                elif raw_escaper is not None:
+                    text = raw_escaper(text)
+                pieces.append(text)
+                run[:] = []
+            pieces.append(piece)
+
+        # Escapers of the enclosing links
+        escapers = []
+        unsupported = []
+        kinds = self._signature_kinds
+        # Elements being walked, with their kind, remaining children and
+        # what to add when leaving them
+        stack = [(node, None, iter(node.children), ')\n')]
+        while stack:
+            element, kind, children, suffix = stack[-1]
+            child = next(children, None)
+            if child is not None:
+                cls = child.__class__
+                if cls is nodes.Text:
+                    run.append(child.astext() if '\x00' in child else child)
+                    continue
+                child_kind = kinds.get(cls)
+                if child_kind is None:
+                    child_kind = signature_kind(cls)
+                    if child_kind is None:
+                        return None
+                if child_kind == SIG_TEXT:
+                    run.append(child.astext() if '\x00' in child else child)
+                    continue
+                if child_kind == SIG_UNKNOWN:
+                    unsupported.append(child.__class__.__name__)
+                    continue
+                suffix = SIGNATURE_SUFFIXES.get(child_kind)
+                if child_kind == SIG_ANNOTATION:
+                    add('_')
+                elif child_kind == SIG_REFERENCE:
+                    url = self._refuri2http(child)
+                    if url is not None:
+                        add('[')
+                        escapers.append(escaper)
+                        escaper = get_escaper(escaper.chars + LINK_TEXT_CHARS)
+                        suffix = '](' + url + ')'
+                stack.append((child, child_kind, iter(child.children), suffix))
+                continue
+            stack.pop()
+            if suffix is None:
+                continue
+            if kind == SIG_PARAMETER and element.parent[-1] is element:
+                # No comma after the last parameter
+                continue
+            add(suffix)
+            if kind == SIG_REFERENCE:
+                escaper = escapers.pop()
+            if kind == SIG_ANNOTATION:
+                pieces[-2] = pieces[-2].strip()
+        for node_type in unsupported:
+            self.warn_unsupported(node_type)
+        return ''.join(pieces)
+
     def visit_desc_parameterlist(self, node):
         # method/class ctor param list
         pass
@@ -198,18 +344,21 @@ class MarkdownTranslator(Translator):
     def visit_rubric(self, node):
         """Sphinx Rubric, a heading without relation to the document sectioning
         http://docutils.sourceforge.net/docs/ref/rst/directives.html#rubric."""
+        self.push_escape(HEADING_CHARS)
         self.add('### ')
 
     def depart_rubric(self, node):
         """Sphinx Rubric, a heading without relation to the document sectioning
         http://docutils.sourceforge.net/docs/ref/rst/directives.html#rubric."""
+        self.pop_escape()
         self.add('\n\n')
 
     def visit_image(self, node):
         """Image directive."""
         uri = node.attributes['uri']
         doc_folder = os.path.dirname(self.builder.current_docname)
-        if uri.startswith(doc_folder):
+        # Links to copied images are final already
+        if not self.markdown_copy_assets and uri.startswith(doc_folder):
             # drop docname prefix
             uri = uri[len(doc_folder):]
             if uri.startswith('/'):
@@ -260,10 +409,35 @@ class MarkdownTranslator(Translator):
         self.ascend('raw')
 
     def visit_table(self, node):
-        self.tables.append(node)
+        config = self.builder.config
+        self.tables.append(TableLayout(
+            node,
+            config.markdown_table_max_rows,
+            config.markdown_table_max_bytes,
+            config.markdown_table_preview_rows
+        ))
 
     def depart_table(self, node):
-        self.tables.pop()
+        table = self.tables.pop()
+        self.add(table.render(self.builder.config.markdown_tables_compact))
+        if table.file is not None:
+            uri = self.builder.close_table_file(table.file)
+            if uri is not None:
+                self.add(
+                    '\n*First {} of {} rows, see the [full table]({}).*\n'
+                    .format(len(table.body_rows), table.spilled_rows, uri)
+                )
+        self.add('\n')
+
+    def spill_table(self, table):
+        """Stream the rows of `table` to a sidecar file from now on."""
+        table_file = self.builder.open_table_file()
+        if table_file is None:
+            # Keep the whole table inline instead
+            table.row_nodes = None
+            return
+        self.side_effects += 1
+        table.spill(table_file)
 
     def visit_tabular_col_spec(self, node):
         pass
@@ -286,38 +460,33 @@ class MarkdownTranslator(Translator):
     def visit_thead(self, node):
         if not len(self.tables):
             raise nodes.SkipNode
-        self.theads.append(node)
+        self.tables[-1].in_head = True
 
     def depart_thead(self, node):
-        for i in range(len(self.table_entries)):
-            length = 0
-            for row in self.table_rows:
-                if len(row.children) > i:
-                    entry_length = len(row.children[i].astext())
-                    if entry_length > length:
-                        length = entry_length
-            self.add('| ' + ''.join(_.map(range(length), lambda: '-')) + ' ')
-        self.add('|\n')
-        self.table_entries = []
-        self.theads.pop()
+        self.tables[-1].in_head = False
 
     def visit_tbody(self, node):
         if not len(self.tables):
             raise nodes.SkipNode
-        self.tbodys.append(node)
 
     def depart_tbody(self, node):
-        self.tbodys.pop()
+        pass
 
     def visit_row(self, node):
-        if not len(self.theads) and not len(self.tbodys):
+        if not len(self.tables):
             raise nodes.SkipNode
-        self.table_rows.append(node)
+        table = self.tables[-1]
+        if table.file is not None and not table.in_head and table.preview_full:
+            # Beyond the preview, rows are not rendered at all
+            table.spill_row(node)
+            raise nodes.SkipNode
+        table.start_row()
 
     def depart_row(self, node):
-        self.add('|\n')
-        if not len(self.theads):
-            self.table_entries = []
+        table = self.tables[-1]
+        table.end_row(node)
+        if table.over_limit:
+            self.spill_table(table)
 
     def visit_enumerated_list(self, node):
         self.depth.descend('list')
@@ -353,23 +522,15 @@ class MarkdownTranslator(Translator):
         self.depth.ascend('list_item')
 
     def visit_entry(self, node):
-        if not len(self.table_rows):
+        if not len(self.tables) or self.tables[-1].row is None:
             raise nodes.SkipNode
-        self.table_entries.append(node)
-        self.add('| ')
+        self.start_capture()
+        # A bare | ends the cell, even in code spans
+        self.push_escape(TABLE_CELL_CHARS, raw=True)
 
     def depart_entry(self, node):
-        length = 0
-        i = len(self.table_entries) - 1
-        for row in self.table_rows:
-            if len(row.children) > i:
-                entry_length = len(row.children[i].astext())
-                if entry_length > length:
-                    length = entry_length
-        padding = ''.join(
-            _.map(range(length - len(node.astext())), lambda: ' ')
-        )
-        self.add(padding + ' ')
+        self.pop_escape()
+        self.tables[-1].add_cell(self.finish_capture())
 
     def descend(self, node_name):
         self.depth.descend(node_name)
@@ -377,5 +538,84 @@ class MarkdownTranslator(Translator):
     def ascend(self, node_name):
         self.depth.ascend(node_name)
 
+class SingleMarkdownTranslator(MarkdownTranslator):
+    """Translator of the documents of the ``singlemarkdown`` builder.
+
+    All documents end up in the same file, so anchors are prefixed with the
+    docname, like Sphinx prefixes section numbers for ``singlehtml``, and
+    links to other documents are rewritten into links to these anchors.
+    """
+    def fragment_context(self):
+        # Anchor names depend on the document
+        return MarkdownTranslator.fragment_context(self) + (
+            self.builder.current_docname,
+        )
+
+    def anchor_name(self, node_id, docname=None):
+        return '{}/{}'.format(docname or self.builder.current_docname, node_id)
+
+    def add_anchors(self, node, suffix=''):
+        ids = node.get('ids')
+        if ids:
+            self.add(''.join(
+                '<a name="{}"></a>'.format(self.anchor_name(node_id))
+                for node_id in ids
+            ) + suffix)
+
+    def visit_document(self, node):
+        self.add('<a name="document-{}"></a>\n'.format(
+            self.builder.current_docname
+        ))
+
+    def visit_section(self, node):
+        MarkdownTranslator.visit_section(self, node)
+        self.add_anchors(node, '\n')
+
+    def visit_target(self, node):
+        # Inline targets, the ids of others move to the next element
+        if 'refuri' not in node:
+            self.add_anchors(node)
+
+    def _refuri2http(self, node):
+        url = node.get('refuri') or ''
+        if not node.get('internal'):
+            return url
+        if url.startswith('#document-'):
+            # From get_target_uri, maybe followed by the id of a target
+            docname, _, node_id = url[len('#document-'):].partition('#')
+            if node_id:
+                return '#' + self.anchor_name(node_id, docname)
+            return url
+        if not url and 'refid' in node:
+            return '#' + self.anchor_name(node['refid'])
+        return MarkdownTranslator._refuri2http(self, node)
+
+# Handlers whose output render_signature knows, and its kind of them
+SIGNATURE_HANDLERS = {
+    (Translator.visit_Text, Translator.depart_Text): SIG_TEXT,
+    (Translator.visit_inline, Translator.depart_inline): SIG_PASS,
+    (Translator.visit_reference, Translator.depart_reference): SIG_REFERENCE,
+    (
+        MarkdownTranslator.visit_desc_addname,
+        MarkdownTranslator.depart_desc_addname,
+    ): SIG_PASS,
+    (
+        MarkdownTranslator.visit_desc_parameterlist,
+        MarkdownTranslator.depart_desc_parameterlist,
+    ): SIG_PASS,
+    (
+        MarkdownTranslator.visit_desc_annotation,
+        MarkdownTranslator.depart_desc_annotation,
+    ): SIG_ANNOTATION,
+    (
+        MarkdownTranslator.visit_desc_name,
+        MarkdownTranslator.depart_desc_name,
+    ): SIG_NAME,
+    (
+        MarkdownTranslator.visit_desc_parameter,
+        MarkdownTranslator.depart_desc_parameter,
+    ): SIG_PARAMETER,
+}
+
 class MarkdownWriter(Writer):
     translator_class = MarkdownTranslator
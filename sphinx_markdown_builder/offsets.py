@@ -0,0 +1,74 @@
+# Whitespace separating blocks, one byte per character in UTF-8
+BLOCK_WHITESPACE = ' \t\n\r\x0b\x0c'
+
+class OffsetIndex(object):
+    """Stream wrapper recording where documents and sections start.
+
+    `stream` takes text and counts the bytes written to it in ``size``,
+    like :class:`~sphinx_markdown_builder.manifest.DigestWriter`.  Every
+    entry gets the byte offset of its first non-whitespace byte, so the
+    blank lines separating blocks are not part of it, and its length in
+    bytes once it is ended.  Entries nest, the innermost is ended first.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        # Entries of all documents, in output order
+        self.documents = []
+        # Entries of the sections of the current document, in output order
+        self.sections = []
+        # Entries not ended yet, innermost last
+        self._open = []
+        # Entries waiting for their first non-whitespace byte
+        self._pending = []
+
+    @property
+    def size(self):
+        return self.stream.size
+
+    def write(self, text):
+        if self._pending:
+            content = text.lstrip(BLOCK_WHITESPACE)
+            if content:
+                offset = self.stream.size + len(text) - len(content)
+                for entry in self._pending:
+                    entry['offset'] = offset
+                self._pending = []
+        self.stream.write(text)
+
+    def start_document(self, docname, title):
+        self.sections = []
+        entry = {
+            'docname': docname,
+            'title': title,
+            'anchor': 'document-' + docname,
+            'offset': None,
+            'length': None,
+            'sections': self.sections,
+        }
+        self.documents.append(entry)
+        self._start(entry)
+
+    def start_section(self, anchor, title, level):
+        entry = {
+            'anchor': anchor,
+            'title': title,
+            'level': level,
+            'offset': None,
+            'length': None,
+        }
+        self.sections.append(entry)
+        self._start(entry)
+
+    def _start(self, entry):
+        entry['offset'] = self.size
+        self._open.append(entry)
+        self._pending.append(entry)
+
+    def end(self):
+        """End the innermost entry."""
+        entry = self._open.pop()
+        if entry in self._pending:
+            # Nothing was written for it
+            self._pending.remove(entry)
+            entry['offset'] = self.size
+        entry['length'] = self.size - entry['offset']
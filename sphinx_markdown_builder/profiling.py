@@ -0,0 +1,105 @@
+from time import perf_counter
+
+class DispatchProfile(object):
+    """Calls, time and output of visit and depart handlers, by node type.
+
+    ``stats`` maps handler names, e.g. ``visit_paragraph``, to
+    ``[calls, seconds, chars]``.  Children are walked between the visit and
+    the depart of their parent, so the time of a handler is its own.
+
+    ``visit_Text`` only collects runs of text, which are escaped and output
+    by whichever handler comes next.  That work is recorded as
+    ``flush_text`` instead of being charged to that handler.
+    """
+    def __init__(self, stats=None):
+        self.stats = stats if stats is not None else {}
+
+    def record(self, handler, seconds, chars):
+        stat = self.stats.get(handler)
+        if stat is None:
+            self.stats[handler] = [1, seconds, chars]
+        else:
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] += chars
+
+    def merge(self, stats):
+        """Add the ``stats`` of another profile to ours."""
+        for handler, (calls, seconds, chars) in stats.items():
+            stat = self.stats.setdefault(handler, [0, 0.0, 0])
+            stat[0] += calls
+            stat[1] += seconds
+            stat[2] += chars
+
+    def report(self):
+        """Return the profile as a JSON serializable dict, slowest first."""
+        handlers = [{
+            'handler': handler,
+            'calls': calls,
+            'seconds': seconds,
+            'chars': chars,
+        } for handler, (calls, seconds, chars) in self.stats.items()]
+        handlers.sort(key=lambda stat: stat['seconds'], reverse=True)
+        return {'handlers': handlers}
+
+def instrument(translator, profile):
+    """Record all handler calls of `translator` in `profile`.
+
+    The instrumented methods are only set on this translator instance, so
+    translators of normal builds do not pay for any of the bookkeeping.
+    """
+    cls = type(translator)
+    # Characters added to the output so far
+    emitted = [0]
+    # Time spent in and characters added by flush_text so far
+    flushed = [0.0, 0]
+
+    def add(string, section='body'):
+        emitted[0] += len(string)
+        cls.add(translator, string, section)
+
+    def add_section(string, section='body'):
+        emitted[0] += len(string)
+        cls.add_section(translator, string, section)
+
+    def flush_text():
+        chars = emitted[0]
+        start = perf_counter()
+        try:
+            cls.flush_text(translator)
+        finally:
+            seconds = perf_counter() - start
+            chars = emitted[0] - chars
+            profile.record('flush_text', seconds, chars)
+            flushed[0] += seconds
+            flushed[1] += chars
+
+    def profiled(handler, method):
+        def profiled_method(node):
+            chars = emitted[0]
+            flushed_seconds, flushed_chars = flushed
+            start = perf_counter()
+            try:
+                return method(node)
+            finally:
+                # Flushed text is recorded as flush_text
+                profile.record(
+                    handler,
+                    perf_counter() - start - (flushed[0] - flushed_seconds),
+                    emitted[0] - chars - (flushed[1] - flushed_chars)
+                )
+
+        return profiled_method
+
+    def resolve_handlers(node_class):
+        visit, depart = cls.resolve_handlers(translator, node_class)
+        name = node_class.__name__
+        return (
+            profiled('visit_' + name, visit),
+            profiled('depart_' + name, depart),
+        )
+
+    translator.add = add
+    translator.add_section = add_section
+    translator.flush_text = flush_text
+    translator.resolve_handlers = resolve_handlers
@@ -0,0 +1,106 @@
+from .fragments import subtree_digest
+from os import path
+import hashlib
+import json
+import os
+import shutil
+
+def doctree_digest(doctree):
+    """Return a digest of the text and attributes of the resolved `doctree`.
+
+    Unlike pickling the doctree, this leaves out the references between
+    nodes and is cheap compared to translating it.
+    """
+    return subtree_digest(doctree, {})[0].hex()
+
+class RenderCache(object):
+    """Rendered Markdown of previous builds, stored by content key.
+
+    Every entry is a file named after its key, so the main process and write
+    workers can share the cache without any further coordination.  A line of
+    JSON metadata precedes the data of each entry.  Entries are touched when
+    they are used, and the least recently used ones are removed by `prune`
+    once the cache grows beyond `max_size` bytes.
+    """
+    def __init__(self, dirname, max_size):
+        self.dirname = dirname
+        self.max_size = max_size
+
+    @staticmethod
+    def key(*parts):
+        data = '\x00'.join(parts).encode('utf-8')
+        return hashlib.sha256(data).hexdigest()
+
+    def _filename(self, key):
+        return path.join(self.dirname, key[:2], key)
+
+    def get(self, key):
+        """Return the metadata and data stored for `key`, or None."""
+        filename = self._filename(key)
+        try:
+            with open(filename, 'rb') as f:
+                meta = json.loads(f.readline())
+                data = f.read()
+            os.utime(filename)
+        except (OSError, ValueError):
+            return None
+        return meta, data
+
+    def put(self, key, data, meta):
+        """Store `data` for `key`; failures only cost a future cache miss."""
+        self._store(key, meta, lambda f: f.write(data))
+
+    def put_file(self, key, sourcename, meta):
+        """Store a copy of the contents of the file `sourcename` for `key`."""
+        def copy(f):
+            with open(sourcename, 'rb') as source:
+                shutil.copyfileobj(source, f)
+        self._store(key, meta, copy)
+
+    def _store(self, key, meta, write):
+        filename = self._filename(key)
+        tmpname = '{}.{}.tmp'.format(filename, os.getpid())
+        try:
+            os.makedirs(path.dirname(filename), exist_ok=True)
+            with open(tmpname, 'wb') as f:
+                f.write(json.dumps(meta).encode('utf-8') + b'\n')
+                write(f)
+            os.replace(tmpname, filename)
+        except OSError:
+            self._discard(tmpname)
+
+    @staticmethod
+    def _discard(filename):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+    def prune(self):
+        """Remove least recently used entries beyond the size limit."""
+        entries = []
+        total = 0
+        try:
+            subdirs = list(os.scandir(self.dirname))
+        except OSError:
+            return
+        for subdir in subdirs:
+            if not subdir.is_dir(follow_symlinks=False):
+                continue
+            for entry in os.scandir(subdir.path):
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if entry.name.endswith('.tmp'):
+                    # Left over by an interrupted build
+                    self._discard(entry.path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        for mtime, size, filename in entries:
+            if total <= self.max_size:
+                break
+            self._discard(filename)
+            total -= size
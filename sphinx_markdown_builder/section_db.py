@@ -0,0 +1,135 @@
+from os import path
+import os
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sections (
+    id INTEGER PRIMARY KEY,
+    docname TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    anchor TEXT,
+    title TEXT NOT NULL,
+    path TEXT NOT NULL,
+    markdown TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sections_docname ON sections (docname);
+"""
+
+# Full text index of the heading paths and Markdown of all sections, kept up
+# to date with the sections table by triggers
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS sections_fts USING fts5(
+    path, markdown, content='sections', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS sections_ai AFTER INSERT ON sections BEGIN
+    INSERT INTO sections_fts (rowid, path, markdown)
+    VALUES (new.id, new.path, new.markdown);
+END;
+CREATE TRIGGER IF NOT EXISTS sections_ad AFTER DELETE ON sections BEGIN
+    INSERT INTO sections_fts (sections_fts, rowid, path, markdown)
+    VALUES ('delete', old.id, old.path, old.markdown);
+END;
+CREATE TRIGGER IF NOT EXISTS sections_au AFTER UPDATE ON sections BEGIN
+    INSERT INTO sections_fts (sections_fts, rowid, path, markdown)
+    VALUES ('delete', old.id, old.path, old.markdown);
+    INSERT INTO sections_fts (rowid, path, markdown)
+    VALUES (new.id, new.path, new.markdown);
+END;
+"""
+
+# Separator of the titles in heading paths
+PATH_SEPARATOR = ' > '
+
+def split_sections(data, title, sections):
+    """Return the rows of a document rendered to the UTF-8 `data`.
+
+    `sections` are the section entries an OffsetIndex recorded while the
+    document was written.  Each row holds the anchor, title, heading path
+    and Markdown of one section, without its subsections, which have rows
+    of their own.  A document without sections is a single row titled
+    `title`.
+    """
+    if not sections:
+        markdown = data.decode('utf-8').strip()
+        return [[None, title, title, markdown]] if markdown else []
+    rows = []
+    titles = []
+    for i, entry in enumerate(sections):
+        end = entry['offset'] + entry['length']
+        if i + 1 < len(sections):
+            end = min(end, sections[i + 1]['offset'])
+        del titles[entry['level'] - 1:]
+        titles.append(entry['title'])
+        rows.append([
+            entry['anchor'],
+            entry['title'],
+            PATH_SEPARATOR.join(titles),
+            data[entry['offset']:end].decode('utf-8').rstrip(),
+        ])
+    return rows
+
+class SectionDatabase(object):
+    """SQLite database with a row and a full text index entry per section.
+
+    Rows are replaced a document at a time, so incremental builds only
+    touch the rows of the documents they write.  Changes are committed in
+    batches of `batch_size` documents.
+    """
+    batch_size = 500
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def exists(self):
+        return path.isfile(self.filename)
+
+    def update(self, records, docnames):
+        """Replace the rows of the documents in `records` and delete the rows
+        of documents not in `docnames`.
+
+        Every record has the ``docname`` and the ``sections`` rows of one
+        document, as returned by :func:`split_sections`.  Return the number
+        of documents written, and whether SQLite supports the full text
+        index.
+        """
+        os.makedirs(path.dirname(self.filename), exist_ok=True)
+        connection = sqlite3.connect(self.filename)
+        try:
+            connection.executescript(SCHEMA)
+            try:
+                connection.executescript(FTS_SCHEMA)
+                searchable = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5
+                searchable = False
+            cursor = connection.cursor()
+            written = 0
+            for record in records:
+                docname = record['docname']
+                cursor.execute(
+                    'DELETE FROM sections WHERE docname = ?', (docname, )
+                )
+                cursor.executemany(
+                    'INSERT INTO sections '
+                    '(docname, position, anchor, title, path, markdown) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    [
+                        [docname, position] + row
+                        for position, row in enumerate(record['sections'])
+                    ]
+                )
+                written += 1
+                if written % self.batch_size == 0:
+                    connection.commit()
+            removed = [
+                row for row in
+                cursor.execute('SELECT DISTINCT docname FROM sections')
+                if row[0] not in docnames
+            ]
+            cursor.executemany(
+                'DELETE FROM sections WHERE docname = ?', removed
+            )
+            connection.commit()
+        finally:
+            connection.close()
+        return written, searchable
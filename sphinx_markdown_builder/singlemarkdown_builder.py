@@ -0,0 +1,148 @@
+from .compat import (
+    HAS_WRITE_DOCUMENTS, get_and_resolve_doctree, get_app, status_iterator
+)
+from .manifest import DigestWriter
+from .markdown_builder import MarkdownBuilder
+from .markdown_writer import SingleMarkdownTranslator
+from .offsets import OffsetIndex
+from io import open
+from os import path
+import json
+import os
+from sphinx.locale import __
+from sphinx.util import logging
+from sphinx.util.osutil import ensuredir
+
+logger = logging.getLogger(__name__)
+
+class SingleMarkdownBuilder(MarkdownBuilder):
+    """Builds all documents into a single Markdown file.
+
+    Like ``singlehtml``, links between documents become links to anchors in
+    the same file.  Next to the file, ``<root_doc>.offsets.json`` holds the
+    byte offset and length of every document and section, so consumers can
+    seek to them without parsing the Markdown.
+    """
+    name = 'singlemarkdown'
+    epilog = __('The Markdown file is in %(outdir)s.')
+
+    allow_parallel = False
+    default_translator_class = SingleMarkdownTranslator
+
+    # Offsets of the documents in the output file, while writing
+    index = None
+
+    # All links stay within the file
+    markdown_http_base = ''
+    insert_anchors_for_signatures = True
+
+    def init(self):
+        # The single file is written from scratch every time, so there is
+        # no manifest, render cache or per-document output to keep track of
+        self.init_writing()
+
+    def get_outdated_docs(self):
+        return 'all documents'
+
+    def get_target_uri(self, docname, typ=None):
+        if docname in self.env.all_docs:
+            # All references are in the same file
+            return '#document-' + docname
+        return docname + self.out_suffix
+
+    def get_relative_uri(self, from_, to, typ=None):
+        return self.get_target_uri(to, typ)
+
+    def get_asset_uri(self, docname, filename):
+        # The output file is in the output directory
+        return filename
+
+    def get_document_order(self):
+        """Return all docnames, in toctree order from the root document.
+
+        Documents outside of all toctrees, e.g. orphans, follow in
+        alphabetical order.
+        """
+        order = []
+        seen = set()
+        pending = [self.config.root_doc]
+        while pending:
+            docname = pending.pop()
+            if docname in seen or docname not in self.env.all_docs:
+                continue
+            seen.add(docname)
+            order.append(docname)
+            pending.extend(
+                reversed(self.env.toctree_includes.get(docname, ()))
+            )
+        order.extend(sorted(set(self.env.all_docs) - seen))
+        return order
+
+    def write_documents(self, _docnames):
+        docnames = self.get_document_order()
+        outfilename = self.get_outfilename(self.config.root_doc)
+        tmpfilename = outfilename + '.tmp'
+        ensuredir(path.dirname(outfilename))
+        try:
+            with open(tmpfilename, 'wb', buffering=1 << 16) as f:
+                self.index = OffsetIndex(DigestWriter(f))
+                for docname in status_iterator(
+                    docnames,
+                    __('writing output... '),
+                    'darkgreen',
+                    len(docnames),
+                    get_app(self).verbosity,
+                ):
+                    doctree = get_and_resolve_doctree(self, docname)
+                    self.write_doc_serialized(docname, doctree)
+                    self.write_doc(docname, doctree)
+            os.replace(tmpfilename, outfilename)
+            if self.compressor is not None:
+                with open(outfilename, 'rb') as f:
+                    self.compressor.compress(outfilename, f.read())
+        except (IOError, OSError) as err:
+            logger.warning(__('error writing file %s: %s'), outfilename, err)
+            if path.exists(tmpfilename):
+                os.remove(tmpfilename)
+            return
+        self.write_index(outfilename)
+
+    if not HAS_WRITE_DOCUMENTS:
+        def write(self, *ignored):
+            docnames = self.env.all_docs
+            self.prepare_writing(docnames)
+            self.write_documents(docnames)
+
+    def write_markdown(self, docname, doctree):
+        """Append the Markdown of `docname` to the single output file."""
+        index = self.index
+        if index.size:
+            index.write('\n')
+        title = self.env.titles.get(docname)
+        with self.trace.span('stream', docname) as args:
+            start = index.size
+            index.start_document(docname, title.astext() if title else '')
+            self.writer.write_stream(
+                doctree, index, index,
+                free_nodes=self.config.markdown_low_memory
+            )
+            index.end()
+            args['bytes'] = index.size - start
+
+    def write_index(self, outfilename):
+        filename = path.join(
+            self.outdir, self.config.root_doc + '.offsets.json'
+        )
+        try:
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'file': path.basename(outfilename),
+                    'documents': self.index.documents,
+                }, f, ensure_ascii=False, indent=1)
+        except (IOError, OSError) as err:
+            logger.warning(__('error writing file %s: %s'), filename, err)
+
+    def finish(self):
+        self.copy_asset_files()
+        self.join_writer_pool()
+        self.write_reports()
@@ -0,0 +1,252 @@
+from .manifest import DigestWriter
+from functools import lru_cache
+from io import open
+from os import path
+import os
+import unicodedata
+
+# Unicode categories that occupy no column of their own: combining marks,
+# enclosing marks and format characters such as the zero width joiner.
+ZERO_WIDTH_CATEGORIES = ('Mn', 'Me', 'Cf')
+
+@lru_cache(maxsize=None)
+def char_width(char):
+    if unicodedata.category(char) in ZERO_WIDTH_CATEGORIES:
+        return 0
+    return 2 if unicodedata.east_asian_width(char) in 'WF' else 1
+
+def display_width(text):
+    """Return the number of monospace columns needed to display `text`.
+
+    Wide and fullwidth characters (CJK, most emoji) take two columns,
+    combining and format characters take none.
+    """
+    if text.isascii():
+        return len(text)
+    return sum(map(char_width, text))
+
+def cell_text(text):
+    """Collapse rendered entry content onto the single line a cell allows."""
+    return ' '.join(line.strip() for line in text.strip().splitlines())
+
+def text_size(text):
+    """Return the number of bytes of `text` encoded as UTF-8."""
+    if text.isascii():
+        return len(text)
+    return len(text.encode('utf-8'))
+
+class CsvRows(object):
+    """Writes the rows of a spilled table as CSV, as plain text."""
+    suffix = '.csv'
+
+    def __init__(self, stream):
+        # Only needed once a table is spilled
+        import csv
+        self.writer = csv.writer(stream, lineterminator='\n')
+
+    def write_row(self, node, head):
+        self.writer.writerow([entry.astext().strip() for entry in node])
+
+    def close(self):
+        pass
+
+class HtmlRows(object):
+    """Writes the rows of a spilled table as an HTML table, with the spans
+    of its cells."""
+    suffix = '.html'
+
+    def __init__(self, stream):
+        # Only needed once a table is spilled
+        from html import escape
+        self.escape = escape
+        self.stream = stream
+        # Table section of the last row, thead or tbody
+        self.section = None
+        stream.write('<!DOCTYPE html>\n<meta charset="utf-8">\n<table>\n')
+
+    def write_row(self, node, head):
+        section = 'thead' if head else 'tbody'
+        if section != self.section:
+            if self.section is not None:
+                self.stream.write('</{}>\n'.format(self.section))
+            self.stream.write('<{}>\n'.format(section))
+            self.section = section
+        tag = 'th' if head else 'td'
+        cells = []
+        for entry in node:
+            attributes = ''
+            if entry.get('morecols'):
+                attributes += ' colspan="{}"'.format(entry['morecols'] + 1)
+            if entry.get('morerows'):
+                attributes += ' rowspan="{}"'.format(entry['morerows'] + 1)
+            cells.append('<{0}{1}>{2}</{0}>'.format(
+                tag, attributes, self.escape(entry.astext().strip())
+            ))
+        self.stream.write('<tr>' + ''.join(cells) + '</tr>\n')
+
+    def close(self):
+        if self.section is not None:
+            self.stream.write('</{}>\n'.format(self.section))
+        self.stream.write('</table>\n')
+
+TABLE_FORMATS = {'csv': CsvRows, 'html': HtmlRows}
+
+class TableFile(object):
+    """Sidecar file the rows of a large table are streamed to.
+
+    Rows go to a temporary file, which replaces `filename` on :meth:`close`
+    unless its digest is `previous` and the file exists, so unchanged files
+    keep their mtime.
+    """
+    def __init__(self, filename, format, previous=None):
+        self.filename = filename
+        self.previous = previous
+        self._file = open(filename + '.tmp', 'wb', buffering=1 << 16)
+        self._stream = DigestWriter(self._file)
+        self.rows = TABLE_FORMATS[format](self._stream)
+
+    def close(self):
+        """Finish the file and return its digest."""
+        try:
+            self.rows.close()
+        finally:
+            self._file.close()
+        digest = self._stream.hexdigest()
+        if digest == self.previous and path.isfile(self.filename):
+            os.remove(self.filename + '.tmp')
+        else:
+            os.replace(self.filename + '.tmp', self.filename)
+        return digest
+
+    def discard(self):
+        self._file.close()
+        if path.exists(self.filename + '.tmp'):
+            os.remove(self.filename + '.tmp')
+
+class TableLayout(object):
+    """Rows of a table, collected once while the table is being walked.
+
+    Every cell is stored with its text and display width, so column widths
+    can be computed once when the table is complete and each row is then
+    emitted in a single pass.
+
+    Tables with more body rows than `max_rows`, or more bytes of cell text
+    than `max_bytes`, are over the limit, unless the limit is 0.  Once
+    spilled to a TableFile, all rows go to the file and only the header
+    and the first `preview_rows` body rows are kept.
+    """
+    __slots__ = (
+        'node', 'header_rows', 'body_rows', 'in_head', 'row', 'max_rows',
+        'max_bytes', 'preview_rows', 'size', 'row_nodes', 'file',
+        'spilled_rows'
+    )
+
+    def __init__(self, node, max_rows=0, max_bytes=0, preview_rows=0):
+        self.node = node
+        self.header_rows = []
+        self.body_rows = []
+        # True while walking the ``thead`` of the table
+        self.in_head = False
+        # Cells of the row currently being walked, None outside rows
+        self.row = None
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.preview_rows = preview_rows
+        # Bytes of cell text so far
+        self.size = 0
+        # Nodes of the rows so far, to spill them, None without limits
+        self.row_nodes = [] if max_rows > 0 or max_bytes > 0 else None
+        # TableFile the rows are spilled to, if any
+        self.file = None
+        # Number of body rows written to the file
+        self.spilled_rows = 0
+
+    def start_row(self):
+        self.row = []
+
+    def add_cell(self, text):
+        text = cell_text(text)
+        self.row.append((text, display_width(text)))
+
+    def end_row(self, node=None):
+        if self.file is not None:
+            self.spill_row(node)
+        if self.file is None or self.in_head or not self.preview_full:
+            rows = self.header_rows if self.in_head else self.body_rows
+            rows.append(self.row)
+        if self.row_nodes is not None:
+            self.row_nodes.append((node, self.in_head))
+            self.size += sum(text_size(text) for text, _ in self.row)
+        self.row = None
+
+    @property
+    def over_limit(self):
+        return self.row_nodes is not None and (
+            0 < self.max_rows < len(self.body_rows)
+            or 0 < self.max_bytes < self.size
+        )
+
+    @property
+    def preview_full(self):
+        return len(self.body_rows) >= self.preview_rows
+
+    def spill(self, table_file):
+        """Write the rows so far to `table_file`, and all further ones."""
+        self.file = table_file
+        for node, head in self.row_nodes:
+            self.file.rows.write_row(node, head)
+            if not head:
+                self.spilled_rows += 1
+        self.row_nodes = None
+        del self.body_rows[self.preview_rows:]
+
+    def spill_row(self, node):
+        """Write the row `node` to the file only."""
+        self.file.rows.write_row(node, self.in_head)
+        if not self.in_head:
+            self.spilled_rows += 1
+
+    @property
+    def columns(self):
+        cols = 0
+        for tgroup in self.node.children:
+            cols = max(cols, tgroup.get('cols', 0))
+        for row in self.header_rows + self.body_rows:
+            cols = max(cols, len(row))
+        return cols
+
+    def render(self, compact=False):
+        """Return the table as Markdown pipe table rows.
+
+        Pipe tables have exactly one header row, so the first row is used as
+        the header and any further ``thead`` rows follow the delimiter row.
+        With `compact`, cells are not padded to the column width.
+        """
+        rows = self.header_rows + self.body_rows
+        if not rows:
+            return ''
+        columns = self.columns
+        empty = ('', 0)
+        rows = [row + [empty] * (columns - len(row)) for row in rows]
+        if compact:
+            widths = [3] * columns
+        else:
+            widths = [
+                max([3] + [row[i][1] for row in rows]) for i in range(columns)
+            ]
+        lines = [self._format_row(row, widths, compact) for row in rows]
+        lines.insert(
+            1, '| ' + ' | '.join('-' * width for width in widths) + ' |\n'
+        )
+        return ''.join(lines)
+
+    @staticmethod
+    def _format_row(row, widths, compact):
+        if compact:
+            cells = [text for text, width in row]
+        else:
+            cells = [
+                text + ' ' * (column_width - width)
+                for (text, width), column_width in zip(row, widths)
+            ]
+        return '| ' + ' | '.join(cells) + ' |\n'
@@ -0,0 +1,113 @@
+from contextlib import contextmanager, nullcontext
+import os
+import threading
+import time
+
+def now():
+    # Wall clock time, which unlike ``perf_counter`` is comparable between
+    # the main process and write workers on every platform.
+    return time.time()
+
+class BuildTrace(object):
+    """Spans of the build phases of every document.
+
+    Spans are appended to `journal` as Chrome trace events, so the spans of
+    parallel workers are included.  Without a journal, tracing is disabled
+    and ``span`` costs next to nothing.
+    """
+    def __init__(self, journal=None):
+        self.journal = journal
+        # Start times of documents being read, by docname
+        self.reading = {}
+        # End of the last traced step of the main process while writing
+        self.checkpoint = None
+
+    @property
+    def enabled(self):
+        return self.journal is not None
+
+    def add(self, name, docname, start, end, **args):
+        args['docname'] = docname
+        self.journal.append({
+            'name': name,
+            'cat': 'markdown',
+            'ph': 'X',
+            'ts': int(start * 1e6),
+            'dur': int((end - start) * 1e6),
+            'pid': os.getpid(),
+            'tid': threading.get_ident() & 0xffffffff,
+            'args': args,
+        })
+
+    def span(self, name, docname, **args):
+        """Return a context manager that traces its block as a span.
+
+        The context manager returns a dict of span arguments, which the
+        block can add to.
+        """
+        if self.journal is None:
+            return nullcontext({})
+        return self._span(name, docname, args)
+
+    @contextmanager
+    def _span(self, name, docname, args):
+        start = now()
+        try:
+            yield args
+        finally:
+            self.add(name, docname, start, now(), **args)
+
+    def mark(self):
+        """Start the next span of the main process at the current time."""
+        if self.journal is not None:
+            self.checkpoint = now()
+
+def trace_source_read(app, docname, source):
+    trace = getattr(app.builder, 'trace', None)
+    if trace is not None and trace.enabled:
+        trace.reading[docname] = now()
+
+def trace_doctree_read(app, doctree):
+    trace = getattr(app.builder, 'trace', None)
+    if trace is None or not trace.enabled:
+        return
+    docname = app.env.docname
+    start = trace.reading.pop(docname, None)
+    if start is not None:
+        trace.add('read', docname, start, now())
+
+def trace_doctree_resolved(app, doctree, docname):
+    trace = getattr(app.builder, 'trace', None)
+    if trace is None or not trace.enabled or trace.checkpoint is None:
+        return
+    # Doctrees are resolved right before they are written, so resolving
+    # started when the previous step of the main process ended.
+    trace.add('resolve', docname, trace.checkpoint, now())
+
+def summarize(events, limit=10):
+    """Return the slowest and the largest documents of the traced `events`.
+
+    The time of a document is the sum of all its spans, its size the number
+    of bytes of Markdown it was encoded to.
+    """
+    seconds = {}
+    sizes = {}
+    for event in events:
+        docname = event['args'].get('docname')
+        if docname is None:
+            continue
+        seconds[docname] = seconds.get(docname, 0) + event['dur'] / 1e6
+        if 'bytes' in event['args']:
+            sizes[docname] = event['args']['bytes']
+    slowest = sorted(seconds.items(), key=lambda item: item[1], reverse=True)
+    largest = sorted(sizes.items(), key=lambda item: item[1], reverse=True)
+    return {
+        'slowest': [
+            {'docname': docname, 'seconds': value}
+            for docname, value in slowest[:limit]
+        ],
+        'largest': [
+            {'docname': docname, 'bytes': value}
+            for docname, value in largest[:limit]
+        ],
+    }
@@ -0,0 +1,93 @@
+from collections import deque
+from functools import partial
+from os import path
+import os
+import queue
+import threading
+from sphinx.util.osutil import ensuredir
+
+class WriterPool(object):
+    """Threads writing finished output files in the background.
+
+    Writing overlaps with translating the next documents, which pays off
+    when file system calls are slow, e.g. on network file systems.  At most
+    `max_pending` outputs wait in the queue, so the memory they hold stays
+    bounded.  Failed writes are collected and returned by :meth:`join`.
+
+    Threads do not survive the fork of parallel write workers, so outputs
+    are written right away in any other process than the one that created
+    the pool, and also if it has no `threads`.
+    """
+    def __init__(self, threads, max_pending):
+        self.threads = threads
+        self.queue = queue.Queue(max_pending)
+        # Filenames and errors of failed writes
+        self.errors = []
+        # Callbacks of finished writes, called by the thread using the pool
+        self._finished = deque()
+        self._pid = os.getpid()
+        self._workers = []
+        # Directories known to exist
+        self._dirs = set()
+
+    def ensuredir(self, dirname):
+        if dirname not in self._dirs:
+            ensuredir(dirname)
+            self._dirs.add(dirname)
+
+    def write(self, filename, data, done):
+        """Write `data` to `filename`, then call `done`."""
+        self.submit(filename, partial(self.write_file, filename, data), done)
+
+    def submit(self, filename, task, done):
+        """Call `task`, which writes `filename`, then call `done`.
+
+        Errors are raised when writing right away, and collected otherwise.
+        `done` is always called by a thread calling :meth:`submit` or
+        :meth:`join`, never by the threads of the pool.
+        """
+        if not self.threads or os.getpid() != self._pid:
+            task()
+            done()
+            return
+        self._call_finished()
+        if not self._workers:
+            for _ in range(self.threads):
+                worker = threading.Thread(target=self._run, daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        self.queue.put((filename, task, done))
+
+    def write_file(self, filename, data):
+        self.ensuredir(path.dirname(filename))
+        with open(filename, 'wb') as f:
+            f.write(data)
+
+    def _call_finished(self):
+        while self._finished:
+            self._finished.popleft()()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            filename, task, done = item
+            try:
+                task()
+            except Exception as err:
+                # Reported by the main thread, the worker keeps going
+                self.errors.append((filename, err))
+            else:
+                self._finished.append(done)
+
+    def join(self):
+        """Wait for all queued writes, stop the threads and return the
+        errors of failed writes."""
+        for _ in self._workers:
+            self.queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        self._call_finished()
+        return self.errors
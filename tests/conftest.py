@@ -0,0 +1,54 @@
+from io import StringIO
+import os
+
+import pytest
+from sphinx.application import Sphinx
+
+PAGES = {
+    'index.rst': (
+        'Index\n=====\n\n.. toctree::\n\n   other\n   sub/page\n\n'
+        'Some *emph* text, see :doc:`other`.\n'
+    ),
+    'other.rst': 'Other\n=====\n\n* item 1\n* item 2\n',
+    'sub/page.rst': (
+        'Page\n====\n\n.. include:: ../shared.txt\n\n'
+        '===  ===\na    b\n===  ===\n1    2\n===  ===\n'
+    ),
+    'shared.txt': 'Shared text with a_b and \\*star\\*.\n',
+}
+
+@pytest.fixture
+def project(tmp_path):
+    """Return the source directory of a small project."""
+    srcdir = tmp_path / 'src'
+    for name, text in PAGES.items():
+        filename = srcdir / name
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        filename.write_text(text)
+    (srcdir / 'conf.py').write_text(
+        "extensions = ['sphinx_markdown_builder']\n"
+        "exclude_patterns = ['shared.txt']\n"
+    )
+    return srcdir
+
+def make_app(srcdir, outdir, parallel=0, builder='markdown', **confoverrides):
+    """Return a Sphinx application building `srcdir` into `outdir` with
+    `builder`, with its status output in ``app._status``."""
+    return Sphinx(
+        str(srcdir),
+        str(srcdir),
+        str(outdir),
+        os.path.join(str(outdir), '.doctrees'),
+        builder,
+        confoverrides=confoverrides,
+        status=StringIO(),
+        warning=StringIO(),
+        parallel=parallel,
+    )
+
+def build(srcdir, outdir, parallel=0, builder='markdown', **confoverrides):
+    """Build `srcdir` into `outdir` with `builder` and return the status
+    output."""
+    app = make_app(srcdir, outdir, parallel, builder, **confoverrides)
+    app.build()
+    return app._status.getvalue()
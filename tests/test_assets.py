@@ -0,0 +1,40 @@
+import base64
+
+from conftest import build
+
+PAGE = """\
+Page
+====
+
+.. image:: ../images/logo.png
+
+Get the :download:`data <data.csv>`.
+"""
+
+# A transparent 1x1 PNG
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB'
+    '0C8AAAAASUVORK5CYII='
+)
+
+def test_assets_copied_and_linked(project, tmp_path):
+    (project / 'images').mkdir()
+    (project / 'images' / 'logo.png').write_bytes(PNG)
+    (project / 'sub' / 'page.rst').write_text(PAGE)
+    (project / 'sub' / 'data.csv').write_text('a,b\n1,2\n')
+    outdir = tmp_path / 'out'
+    build(project, outdir, markdown_copy_assets=True)
+    assert (outdir / '_images' / 'logo.png').read_bytes() == PNG
+    downloads = list((outdir / '_downloads').glob('*/data.csv'))
+    assert len(downloads) == 1
+    assert downloads[0].read_text() == 'a,b\n1,2\n'
+    output = (outdir / 'sub' / 'page.md').read_text()
+    assert '](../_images/logo.png)' in output
+    download = downloads[0].relative_to(outdir).as_posix()
+    assert '[data](../{})'.format(download) in output
+
+    # Assets no document uses any longer are removed
+    (project / 'sub' / 'page.rst').write_text('Page\n====\n\nText.\n')
+    build(project, outdir, markdown_copy_assets=True)
+    assert not (outdir / '_images' / 'logo.png').exists()
+    assert not downloads[0].exists()
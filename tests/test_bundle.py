@@ -0,0 +1,42 @@
+import json
+import os
+import zlib
+
+from conftest import build
+
+def read_shards(outdir):
+    """Return the records of the two bundle shards in `outdir`."""
+    shards = []
+    for i in range(2):
+        filename = outdir / 'bundle-{:03d}-of-002.jsonl'.format(i)
+        with filename.open(encoding='utf-8') as f:
+            shards.append([json.loads(line) for line in f])
+    return shards
+
+def test_shard_records(project, tmp_path):
+    outdir = tmp_path / 'out'
+    config = dict(markdown_bundle='bundle.jsonl', markdown_bundle_shards=2)
+    build(project, outdir, **config)
+    shards = read_shards(outdir)
+    assert not (outdir / 'bundle.jsonl').exists()
+    records = {}
+    for i, shard in enumerate(shards):
+        for record in shard:
+            docname = record['docname']
+            assert zlib.crc32(docname.encode('utf-8')) % 2 == i
+            records[docname] = record
+    assert sorted(records) == ['index', 'other', 'sub/page']
+    index = records['index']
+    assert index['title'] == 'Index'
+    assert index['uri'] == 'index.md'
+    assert index['source'] == 'index.rst'
+    assert index['markdown'] == (outdir / 'index.md').read_text()
+    assert index['links'] == ['other.md', 'sub/page.md']
+    assert records['sub/page']['source'] == 'sub/page.rst'
+
+    # Documents not written again, sub/page, are copied from the previous
+    # bundle
+    os.utime(project / 'other.rst')
+    status = build(project, outdir, **config)
+    assert 'documents written and 1 kept' in status
+    assert read_shards(outdir) == shards
@@ -0,0 +1,57 @@
+import json
+
+from conftest import build
+from sphinx_markdown_builder.chunks import count_tokens
+
+OTHER = """\
+Other
+=====
+
+{}
+
+Usage
+-----
+
+Call it once.
+"""
+
+PARAGRAPHS = '\n\n'.join(
+    'Paragraph {} has a few words in it.'.format(i) for i in range(10)
+)
+
+def read_chunks(outdir):
+    with (outdir / 'chunks.jsonl').open(encoding='utf-8') as f:
+        chunks = [json.loads(line) for line in f]
+    changes = json.loads((outdir / 'chunks.changes.json').read_text())
+    return chunks, changes
+
+def test_token_bounds_and_changes(project, tmp_path):
+    (project / 'other.rst').write_text(OTHER.format(PARAGRAPHS))
+    outdir = tmp_path / 'out'
+    config = dict(markdown_chunks='chunks.jsonl', markdown_chunk_tokens=30)
+    build(project, outdir, **config)
+    chunks, changes = read_chunks(outdir)
+    other = [chunk for chunk in chunks if chunk['docname'] == 'other']
+    # Ten paragraphs of 9 tokens, three to a chunk, and the Usage section
+    assert len(other) == 5
+    for chunk in chunks:
+        assert chunk['tokens'] == count_tokens(chunk['text'])
+        assert chunk['tokens'] <= 30
+    assert other[-1]['path'] == 'Other > Usage'
+    assert other[-1]['uri'] == 'other.md#usage'
+    assert changes == {
+        'added': sorted(chunk['id'] for chunk in chunks),
+        'removed': [],
+    }
+
+    # Only the chunk of the changed paragraph is replaced
+    (project / 'other.rst').write_text(
+        OTHER.format(PARAGRAPHS.replace('Paragraph 9', 'Paragraph nine'))
+    )
+    build(project, outdir, **config)
+    new_chunks, changes = read_chunks(outdir)
+    old_ids = set(chunk['id'] for chunk in chunks)
+    new_ids = set(chunk['id'] for chunk in new_chunks)
+    assert len(changes['added']) == len(changes['removed']) == 1
+    assert changes['added'] == sorted(new_ids - old_ids)
+    assert changes['removed'] == sorted(old_ids - new_ids)
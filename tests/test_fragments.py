@@ -0,0 +1,26 @@
+from conftest import build
+
+CLASSES = '''Other
+=====
+
+.. py:class:: ChainMap
+
+   .. py:method:: clear()
+
+      Remove all items.
+
+.. py:class:: Counter
+
+   .. py:method:: clear()
+
+      Remove all items.
+'''
+
+def test_inherited_members_share_fragments(project, tmp_path):
+    (project / 'other.rst').write_text(CLASSES)
+    outdir = tmp_path / 'out'
+    status = build(project, outdir, markdown_fragment_cache_size=1 << 20)
+    # The second clear() is the same as the first
+    assert 'fragment cache: 1 hits' in status
+    output = (outdir / 'other.md').read_text()
+    assert output.count('#### clear()') == 2
@@ -0,0 +1,46 @@
+import os
+
+from conftest import build
+
+def test_touched_source_settles(project, tmp_path):
+    outdir = tmp_path / 'out'
+    build(project, outdir)
+    output = outdir / 'other.md'
+    mtime = output.stat().st_mtime_ns
+    # Newer than the first build, but with the same content
+    os.utime(project / 'other.rst')
+
+    status = build(project, outdir)
+    assert '1 source files that are out of date' in status
+    # Same content, so the output is not rewritten
+    assert output.stat().st_mtime_ns == mtime
+
+    status = build(project, outdir)
+    assert 'no targets are out of date' in status
+    assert output.stat().st_mtime_ns == mtime
+
+def test_touched_dependency_settles(project, tmp_path):
+    outdir = tmp_path / 'out'
+    build(project, outdir)
+    os.utime(project / 'shared.txt')
+    build(project, outdir)
+    status = build(project, outdir)
+    assert 'no targets are out of date' in status
+
+def test_reporting_settings_keep_outputs(project, tmp_path):
+    outdir = tmp_path / 'out'
+    build(project, outdir)
+    status = build(
+        project, outdir,
+        markdown_trace='trace.json', markdown_profile='profile.json'
+    )
+    assert 'no targets are out of date' in status
+
+def test_removed_document_output_is_removed(project, tmp_path):
+    outdir = tmp_path / 'out'
+    build(project, outdir)
+    (project / 'other.rst').unlink()
+    build(project, outdir)
+    assert not (outdir / 'other.md').exists()
+    status = build(project, outdir)
+    assert 'no targets are out of date' in status
@@ -0,0 +1,102 @@
+from conftest import build
+
+# Nested lists, block quotes and code blocks, whose lines get the prefixes of
+# all enclosing levels
+SOURCE = """\
+Other
+=====
+
+* Item one
+
+  * Nested item with ``code``
+
+    1. Deep enumerated
+    2. Second
+
+       .. code-block:: python
+
+          def f():
+              return 1
+
+  * Back up
+
+* Item two
+
+  Continued paragraph.
+
+  A quote follows:
+
+    Quoted text
+    spanning lines.
+
+      Nested quote with a list:
+
+      * quoted item
+      * another
+
+  .. code-block:: text
+
+     inside a list
+       indented
+
+1. First
+2. Second
+
+   > not a quote
+
+Trailing paragraph.
+"""
+
+# As written before indentation prefixes were deferred to the outermost level
+EXPECTED = """\
+# Other
+
+
+* Item one
+    * Nested item with `code`
+        1. Deep enumerated
+        2. Second
+
+```python
+def f():
+    return 1
+```
+
+
+    * Back up
+
+
+* Item two
+
+Continued paragraph.
+
+A quote follows:
+
+> Quoted text
+> spanning lines.
+
+> > Nested quote with a list:
+
+
+> >     * quoted item
+> >     * another
+
+```text
+inside a list
+  indented
+```
+
+
+1. First
+2. Second
+
+> not a quote
+
+Trailing paragraph.
+"""
+
+def test_nested_blocks(project, tmp_path):
+    (project / 'other.rst').write_text(SOURCE)
+    outdir = tmp_path / 'out'
+    build(project, outdir)
+    assert (outdir / 'other.md').read_text() == EXPECTED
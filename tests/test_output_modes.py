@@ -0,0 +1,105 @@
+import gzip
+
+import pytest
+
+from conftest import build
+from sphinx_markdown_builder.markdown_writer import MarkdownTranslator
+
+# Signatures, tables and nested blocks, which each write path handles
+SOURCE = """\
+Other
+=====
+
+.. py:class:: Point(x, y)
+
+   A point.
+
+   .. py:method:: move(dx: int, dy: int = 0)
+
+      Move by *dx* and *dy*.
+
+   .. py:attribute:: x
+      :type: int
+
+.. py:function:: distance(a, b) -> float
+
+   Return the distance of ``a|b``.
+
+* Item
+
+  1. Nested
+
+     .. code-block:: python
+
+        def f():
+            return 1
+
+  Text.
+
+    Quoted text.
+
+.. note::
+
+   A note.
+
+=====  ======
+Name   Value
+=====  ======
+a_b    1
+c*d    2
+=====  ======
+"""
+
+MODES = {
+    'stream': dict(markdown_stream_output=True),
+    'low_memory': dict(markdown_low_memory=True),
+    'memory_budget': dict(markdown_memory_budget=1 << 30),
+}
+
+def read_outputs(outdir):
+    """Return the contents of all Markdown files below `outdir`, by path."""
+    return dict(
+        (filename.relative_to(outdir).as_posix(), filename.read_bytes())
+        for filename in sorted(outdir.rglob('*.md'))
+    )
+
+@pytest.fixture
+def default_outputs(project, tmp_path):
+    """Return the outputs of a build with default settings."""
+    (project / 'other.rst').write_text(SOURCE)
+    outdir = tmp_path / 'default'
+    build(project, outdir)
+    outputs = read_outputs(outdir)
+    assert sorted(outputs) == ['index.md', 'other.md', 'sub/page.md']
+    return outputs
+
+@pytest.mark.parametrize('mode', sorted(MODES))
+def test_output_matches_default(project, tmp_path, default_outputs, mode):
+    outdir = tmp_path / mode
+    build(project, outdir, **MODES[mode])
+    assert read_outputs(outdir) == default_outputs
+
+@pytest.mark.parametrize('stream', [False, True], ids=['buffered', 'stream'])
+def test_compressed_siblings_match_default(
+    project, tmp_path, default_outputs, stream
+):
+    outdir = tmp_path / 'gzip'
+    build(
+        project, outdir,
+        markdown_compress=['gzip'], markdown_stream_output=stream
+    )
+    assert read_outputs(outdir) == default_outputs
+    for name, data in default_outputs.items():
+        sibling = outdir / (name + '.gz')
+        assert gzip.decompress(sibling.read_bytes()) == data
+
+def test_signature_fast_path_matches_handlers(
+    project, tmp_path, default_outputs, monkeypatch
+):
+    # Every signature is walked with the handlers of its nodes instead
+    monkeypatch.setattr(
+        MarkdownTranslator, 'render_signature', lambda self, node: None
+    )
+    outdir = tmp_path / 'handlers'
+    build(project, outdir)
+    assert read_outputs(outdir) == default_outputs
@@ -0,0 +1,43 @@
+import json
+
+from conftest import build
+
+def read_tree(outdir):
+    """Return the contents of all output files below `outdir`, by path.
+
+    The times documents were confirmed current are left out of the
+    manifest, as they differ between any two builds.
+    """
+    files = {}
+    for filename in sorted(outdir.rglob('*')):
+        name = filename.relative_to(outdir).as_posix()
+        if name.startswith('.doctrees') or not filename.is_file():
+            continue
+        data = filename.read_bytes()
+        if name == '.markdown-manifest.json':
+            manifest = json.loads(data.decode('utf-8'))
+            manifest.pop('confirmed')
+            data = json.dumps(manifest, sort_keys=True).encode('utf-8')
+        files[name] = data
+    return files
+
+def test_parallel_output_is_identical(project, tmp_path):
+    # Enough documents for several chunks per write worker
+    toctree = ''.join('   page{}\n'.format(i) for i in range(12))
+    for i in range(12):
+        (project / 'page{}.rst'.format(i)).write_text(
+            'Page {0}\n=======\n\nSee :doc:`page{1}` and :doc:`index`.\n'
+            .format(i, (i + 1) % 12)
+        )
+    with open(str(project / 'index.rst'), 'a') as f:
+        f.write('\n.. toctree::\n\n' + toctree)
+
+    serial = tmp_path / 'serial'
+    parallel = tmp_path / 'parallel'
+    build(project, serial, parallel=1)
+    build(project, parallel, parallel=4)
+
+    files = read_tree(serial)
+    assert '.markdown-manifest.json' in files
+    assert 'page11.md' in files
+    assert read_tree(parallel) == files
@@ -0,0 +1,17 @@
+import json
+
+from conftest import build
+
+def test_text_is_attributed_to_flush_text(project, tmp_path):
+    outdir = tmp_path / 'out'
+    build(project, outdir, markdown_profile='profile.json')
+    report = json.loads((outdir / 'profile.json').read_text())
+    stats = dict((stat['handler'], stat) for stat in report['handlers'])
+    assert stats['flush_text']['chars'] > 0
+    # Text runs are collected, not output, when visited
+    assert stats['visit_Text']['chars'] == 0
+    # Every character is counted once
+    assert sum(stat['chars'] for stat in stats.values()) == sum(
+        len(filename.read_text(encoding='utf-8'))
+        for filename in outdir.rglob('*.md')
+    )
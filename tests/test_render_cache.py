@@ -0,0 +1,69 @@
+import json
+import os
+
+from conftest import make_app
+from sphinx_markdown_builder.render_cache import RenderCache
+
+# The return annotation is a desc_returns node, which is not supported
+FUNCTION = """\
+Other
+=====
+
+.. py:function:: answer() -> int
+
+   Return the answer.
+"""
+
+def build_outputs(srcdir, outdir):
+    """Build `srcdir` into `outdir` with the render cache and return the
+    outputs, the warnings and the hits of the render cache by document."""
+    app = make_app(
+        srcdir, outdir, markdown_render_cache_size=1 << 20,
+        markdown_trace='trace.json'
+    )
+    app.build()
+    outputs = dict(
+        (filename, (outdir / filename).read_bytes())
+        for filename in ('index.md', 'other.md', 'sub/page.md')
+    )
+    events = json.loads((outdir / 'trace.json').read_text())['traceEvents']
+    hits = dict(
+        (event['args']['docname'], event['args']['hit'])
+        for event in events
+        if event['ph'] == 'X' and event['name'] == 'cache'
+    )
+    # Later apps in a process also warn about node classes registered again
+    warnings = [
+        line for line in app._warning.getvalue().splitlines()
+        if 'not yet supported' in line
+    ]
+    return outputs, warnings, hits
+
+def test_warm_build_reuses_cache(project, tmp_path):
+    (project / 'other.rst').write_text(FUNCTION)
+    outdir = tmp_path / 'out'
+    outputs, warnings, hits = build_outputs(project, outdir)
+    assert hits == {'index': False, 'other': False, 'sub/page': False}
+    assert len(warnings) == 1 and 'desc_returns' in warnings[0]
+    for filename in outputs:
+        os.remove(str(outdir / filename))
+    warm_outputs, warm_warnings, hits = build_outputs(project, outdir)
+    assert hits == {'index': True, 'other': True, 'sub/page': True}
+    assert warm_outputs == outputs
+    assert warm_warnings == warnings
+
+def test_prune_removes_least_recently_used(tmp_path):
+    cache = RenderCache(str(tmp_path), 250)
+    keys = [RenderCache.key(str(i)) for i in range(4)]
+    for i, key in enumerate(keys):
+        cache.put(key, b'x' * 100, {})
+        os.utime(cache._filename(key), (1000 + i, 1000 + i))
+    # Using an entry makes it the most recently used
+    assert cache.get(keys[0]) == ({}, b'x' * 100)
+    leftover = cache._filename(keys[1]) + '.1.tmp'
+    open(leftover, 'wb').close()
+    cache.prune()
+    assert [cache.get(key) is not None for key in keys] == [
+        True, False, False, True
+    ]
+    assert not os.path.exists(leftover)
@@ -0,0 +1,59 @@
+import sqlite3
+
+from conftest import build
+
+OTHER = """\
+Other
+=====
+
+Introduction.
+
+Installing
+----------
+
+Run the zanzibar installer.
+
+Usage
+-----
+
+Call it.
+"""
+
+def query(filename, sql, *params):
+    connection = sqlite3.connect(str(filename))
+    try:
+        return connection.execute(sql, params).fetchall()
+    finally:
+        connection.close()
+
+def test_full_text_search(project, tmp_path):
+    (project / 'other.rst').write_text(OTHER)
+    outdir = tmp_path / 'out'
+    build(project, outdir, markdown_sections_db='sections.db')
+    rows = query(
+        outdir / 'sections.db',
+        'SELECT docname, anchor, path, markdown FROM sections '
+        'WHERE id IN (SELECT rowid FROM sections_fts '
+        'WHERE sections_fts MATCH ?)', 'zanzibar'
+    )
+    assert len(rows) == 1
+    docname, anchor, heading_path, markdown = rows[0]
+    assert (docname, anchor) == ('other', 'installing')
+    assert heading_path == 'Other > Installing'
+    assert 'Run the zanzibar installer.' in markdown
+    # Without the following section
+    assert 'Call it.' not in markdown
+
+def test_removed_documents_are_deleted(project, tmp_path):
+    outdir = tmp_path / 'out'
+    build(project, outdir, markdown_sections_db='sections.db')
+    (project / 'other.rst').unlink()
+    build(project, outdir, markdown_sections_db='sections.db')
+    rows = query(outdir / 'sections.db', 'SELECT docname FROM sections')
+    assert set(row[0] for row in rows) == {'index', 'sub/page'}
+    # The full text index is kept in sync by triggers
+    rows = query(
+        outdir / 'sections.db',
+        'SELECT rowid FROM sections_fts WHERE sections_fts MATCH ?', 'item'
+    )
+    assert rows == []
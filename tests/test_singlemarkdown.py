@@ -0,0 +1,16 @@
+from conftest import make_app
+
+def test_no_per_document_state(project, tmp_path):
+    outdir = tmp_path / 'out'
+    app = make_app(
+        project, outdir, builder='singlemarkdown',
+        markdown_render_cache_size=1 << 20
+    )
+    # The single file is written from scratch, nothing to keep track of
+    assert app.builder.manifest is None
+    assert app.builder.render_cache is None
+    assert not hasattr(app.builder, 'written')
+    app.build()
+    assert (outdir / 'index.md').exists()
+    assert (outdir / 'index.offsets.json').exists()
+    assert not (outdir / '.markdown-manifest.json').exists()
@@ -0,0 +1,63 @@
+import csv
+
+from conftest import build
+
+TABLE = '''Other
+=====
+
+===  ===========
+Num  Word
+===  ===========
+1    one
+2    two
+3    three, four
+4    five
+===  ===========
+'''
+
+def test_large_table_is_spilled(project, tmp_path):
+    (project / 'other.rst').write_text(TABLE)
+    outdir = tmp_path / 'out'
+    build(
+        project, outdir,
+        markdown_table_max_rows=3, markdown_table_preview_rows=2
+    )
+    with open(str(outdir / 'other.table-1.csv'), newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows == [
+        ['Num', 'Word'],
+        ['1', 'one'],
+        ['2', 'two'],
+        ['3', 'three, four'],
+        ['4', 'five'],
+    ]
+    output = (outdir / 'other.md').read_text()
+    # The header and the preview rows stay in the page
+    assert [line for line in output.splitlines() if line.startswith('|')] == [
+        '| Num | Word |',
+        '| --- | ---- |',
+        '| 1   | one  |',
+        '| 2   | two  |',
+    ]
+    assert '[full table](other.table-1.csv)' in output
+
+def test_small_table_stays_in_the_page(project, tmp_path):
+    (project / 'other.rst').write_text(TABLE)
+    outdir = tmp_path / 'out'
+    build(project, outdir, markdown_table_max_rows=4)
+    assert not (outdir / 'other.table-1.csv').exists()
+    assert '| 4   | five        |' in (outdir / 'other.md').read_text()
+
+def test_table_spilled_by_size(project, tmp_path):
+    (project / 'other.rst').write_text(TABLE)
+    outdir = tmp_path / 'out'
+    build(project, outdir, markdown_table_max_bytes=20)
+    assert (outdir / 'other.table-1.csv').exists()
+
+def test_sidecar_removed_once_not_spilled(project, tmp_path):
+    (project / 'other.rst').write_text(TABLE)
+    outdir = tmp_path / 'out'
+    build(project, outdir, markdown_table_max_rows=3)
+    assert (outdir / 'other.table-1.csv').exists()
+    build(project, outdir)
+    assert not (outdir / 'other.table-1.csv').exists()
@@ -0,0 +1,75 @@
+import pytest
+
+from conftest import build
+from sphinx_markdown_builder.tables import display_width
+
+# Wide CJK characters and emoji take two columns, combining marks none
+TABLE = """\
+Other
+=====
+
+.. list-table::
+   :header-rows: 1
+
+   * - Name
+     - Kind
+   * - 漢字
+     - wide
+   * - 👍
+     - a|b
+   * - e\\ \u0301
+     - combining
+"""
+
+PADDED = """\
+# Other
+
+| Name | Kind      |
+| ---- | --------- |
+| 漢字 | wide      |
+| 👍   | a\\|b      |
+| é    | combining |
+"""
+
+COMPACT = """\
+# Other
+
+| Name | Kind |
+| --- | --- |
+| 漢字 | wide |
+| 👍 | a\\|b |
+| é | combining |
+"""
+
+def test_pipe_in_code_span_is_escaped(project, tmp_path):
+    (project / 'other.rst').write_text(
+        'Other\n=====\n\n'
+        '==========  ========\n'
+        'Operator    Meaning\n'
+        '==========  ========\n'
+        '``a | b``   union\n'
+        'a | b       or\n'
+        '==========  ========\n'
+    )
+    outdir = tmp_path / 'out'
+    build(project, outdir)
+    output = (outdir / 'other.md').read_text()
+    assert '`a \\| b`' in output
+    assert 'a \\| b ' in output
+    assert 'a | b' not in output
+
+def test_display_width():
+    assert display_width('abc') == 3
+    assert display_width('\u6f22\u5b57') == 4
+    assert display_width('\U0001f44d') == 2
+    assert display_width('e\u0301') == 1
+
+@pytest.mark.parametrize('compact, expected', [
+    (False, PADDED),
+    (True, COMPACT),
+], ids=['padded', 'compact'])
+def test_table_layout(project, tmp_path, compact, expected):
+    (project / 'other.rst').write_text(TABLE, encoding='utf-8')
+    outdir = tmp_path / 'out'
+    build(project, outdir, markdown_tables_compact=compact)
+    assert (outdir / 'other.md').read_text(encoding='utf-8') == expected
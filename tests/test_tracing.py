@@ -0,0 +1,46 @@
+import json
+
+from conftest import build
+
+def test_write_spans_cover_file_io(project, tmp_path):
+    outdir = tmp_path / 'out'
+    build(project, outdir, markdown_trace='trace.json')
+    events = json.loads((outdir / 'trace.json').read_text())['traceEvents']
+    spans = [event for event in events if event['ph'] == 'X']
+    writes = set(
+        event['args']['docname'] for event in spans
+        if event['name'] == 'write'
+    )
+    assert writes == {'index', 'other', 'sub/page'}
+    # Files are written by the threads of the writer pool
+    main = set(
+        event['tid'] for event in spans if event['name'] == 'translate'
+    )
+    assert all(
+        event['tid'] not in main for event in spans
+        if event['name'] == 'write'
+    )
+    # Each document is read, translated and written
+    for name in ('read', 'translate', 'submit'):
+        assert any(event['name'] == name for event in spans)
+
+def test_no_writer_threads_with_parallel_workers(project, tmp_path):
+    # Enough documents for the write workers to be forked
+    for i in range(8):
+        (project / 'page{}.rst'.format(i)).write_text(
+            'Page {0}\n======\n\nText.\n'.format(i)
+        )
+    outdir = tmp_path / 'out'
+    build(project, outdir, parallel=4, markdown_trace='trace.json')
+    events = json.loads((outdir / 'trace.json').read_text())['traceEvents']
+    spans = [event for event in events if event['ph'] == 'X']
+    threads = dict(
+        (event['args']['docname'], (event['pid'], event['tid']))
+        for event in spans if event['name'] == 'translate'
+    )
+    writes = [event for event in spans if event['name'] == 'write']
+    assert len(writes) == len(threads)
+    # Written right away by the process and thread that translated them
+    for event in writes:
+        docname = event['args']['docname']
+        assert (event['pid'], event['tid']) == threads[docname]
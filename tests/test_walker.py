@@ -0,0 +1,79 @@
+import random
+
+import pytest
+from docutils import nodes
+from docutils.core import publish_doctree
+
+from sphinx_markdown_builder.compat import findall
+from sphinx_markdown_builder.doctree2md import Translator
+
+EXCEPTIONS = [
+    nodes.SkipNode, nodes.SkipDeparture, nodes.SkipChildren,
+    nodes.SkipSiblings, nodes.StopTraversal
+]
+
+# Exceptions docutils handles when raised by a depart handler
+DEPART_EXCEPTIONS = [
+    nodes.SkipChildren, nodes.SkipSiblings, nodes.StopTraversal
+]
+
+class Recorder(Translator):
+    """Records the handler calls of a walk, raising `actions` of the nodes,
+    a dict of exception classes by ``(id(node), 'visit' or 'depart')``."""
+    def __init__(self, document, actions):
+        Translator.__init__(self, document)
+        self.actions = actions
+        self.calls = []
+
+    def resolve_handlers(self, cls):
+        return self.handler('visit'), self.handler('depart')
+
+    def handler(self, kind):
+        def handle(node):
+            self.calls.append((kind, node['name']))
+            action = self.actions.get((id(node), kind))
+            if action is not None:
+                raise action()
+
+        return handle
+
+def make_tree(rng, depth=0):
+    """Return a random tree of containers, up to five levels deep."""
+    node = nodes.container()
+    if depth < 4:
+        for _ in range(rng.randint(0, 4)):
+            node += make_tree(rng, depth + 1)
+    return node
+
+def walk(walker, document, tree, actions):
+    """Walk `tree` with `walker` and return the calls, the result and the
+    class of the exception escaping the walk, if any."""
+    recorder = Recorder(document, actions)
+    try:
+        result = walker(recorder, tree)
+    except tuple(EXCEPTIONS) as err:
+        return recorder.calls, None, type(err)
+    return recorder.calls, result, None
+
+@pytest.mark.parametrize('exception', EXCEPTIONS, ids=lambda cls: cls.__name__)
+def test_iterative_walk_matches_docutils(exception):
+    document = publish_doctree('')
+    rng = random.Random(exception.__name__)
+    for _ in range(200):
+        tree = make_tree(rng)
+        actions = {}
+        for index, node in enumerate(findall(tree, nodes.Node)):
+            node['name'] = str(index)
+            if rng.random() < 0.15:
+                actions[(id(node), 'visit')] = exception
+            if exception in DEPART_EXCEPTIONS and rng.random() < 0.15:
+                actions[(id(node), 'depart')] = exception
+        expected = walk(
+            lambda recorder, tree: nodes.Node.walkabout(tree, recorder),
+            document, tree, actions
+        )
+        actual = walk(
+            lambda recorder, tree: recorder.walkabout(tree),
+            document, tree, actions
+        )
+        assert actual == expected